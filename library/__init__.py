@@ -3,10 +3,11 @@ from pathlib import Path
 from typing import Union, Iterable
 from typing_extensions import _SpecialForm
 
-from graia.ariadne.message.parser.twilight import UnionMatch, SpacePolicy
+from graia.ariadne.message.parser.twilight import RegexMatch, UnionMatch, SpacePolicy
 from loguru import logger
 
 from library.config import config
+from library.config.snapshot import snapshot
 
 __version__ = "0.1.0"
 
@@ -29,7 +30,7 @@ logger.add(
     rotation=time(),
 )
 
-PrefixMatch = UnionMatch(*config.func.prefix).space(SpacePolicy.NOSPACE)
+PrefixMatch = RegexMatch(snapshot().prefix_pattern.pattern).space(SpacePolicy.NOSPACE)
 
 
 def prefix_match(
@@ -0,0 +1,222 @@
+import functools
+import inspect
+import json
+import time
+import types
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from graia.broadcast.builtin.decorators import Depend
+from graia.saya.behaviour import Behaviour
+from graia.saya.builtins.broadcast import ListenerSchema
+from graia.saya.cube import Cube
+
+from library.config import config
+from library.storage import atomic_write
+
+_dispatch_start: ContextVar[float | None] = ContextVar("_dispatch_start", default=None)
+
+
+@types.coroutine
+def _cpu_timed(awaitable: Awaitable, cpu: list[float]):
+    """
+    Await an awaitable, adding the thread CPU time of each of its steps to
+    cpu[0], so coroutines running while it is suspended are not charged.
+
+    :param awaitable: Awaitable to drive.
+    :param cpu: Single-item list accumulating CPU seconds.
+    :return: Result of the awaitable.
+    """
+
+    iterator = awaitable.__await__()
+    value, error = None, None
+    while True:
+        start = time.thread_time()
+        try:
+            if error is None:
+                yielded = iterator.send(value)
+            else:
+                yielded = iterator.throw(error)
+        except StopIteration as e:
+            return e.value
+        finally:
+            cpu[0] += time.thread_time() - start
+        try:
+            value, error = (yield yielded), None
+        except BaseException as e:
+            value, error = None, e
+
+
+class PluginAccounting:
+    """
+    Runtime statistics of listeners, keyed by module pack.
+    """
+
+    __instance: "PluginAccounting" = None
+    __stats: dict[str, dict[str, int | float]]
+    __path: Path = Path(config.path.data, "library", "plugin_stats.json")
+
+    def __init__(self):
+        self.__stats = {}
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __record(self, pack: str) -> dict[str, int | float]:
+        if (record := self.__stats.get(pack, None)) is None:
+            record = self.__stats[pack] = {
+                "dispatched": 0,
+                "calls": 0,
+                "errors": 0,
+                "wall": 0.0,
+                "cpu": 0.0,
+                "depend": 0.0,
+            }
+        return record
+
+    def dispatched(self, pack: str):
+        """
+        Record a listener of the module being dispatched, before its Depends run.
+
+        :param pack: Module pack.
+        :return: None.
+        """
+
+        self.__record(pack)["dispatched"] += 1
+        _dispatch_start.set(time.perf_counter())
+
+    def called(self, pack: str, wall: float, cpu: float, depend: float, error: bool):
+        """
+        Record a finished listener call.
+
+        :param pack: Module pack.
+        :param wall: Wall time of the listener body in seconds.
+        :param cpu: CPU time spent in the steps of the body itself in seconds.
+        :param depend: Time between dispatch and the body in seconds.
+        :param error: Whether the body raised.
+        :return: None.
+        """
+
+        record = self.__record(pack)
+        record["calls"] += 1
+        record["errors"] += int(error)
+        record["wall"] += wall
+        record["cpu"] += cpu
+        record["depend"] += depend
+
+    def wrap(self, pack: str, func: Callable) -> Callable:
+        """
+        Wrap a listener callable with accounting, the signature is kept
+        so parameters are still dispatched by annotation.
+
+        :param pack: Module pack.
+        :param func: Listener callable.
+        :return: Wrapped callable.
+        """
+
+        @functools.wraps(func)
+        async def __accounted(*args, **kwargs) -> Any:
+            start = time.perf_counter()
+            dispatch_start = _dispatch_start.get()
+            cpu = [0.0]
+            error = False
+            try:
+                call = time.thread_time()
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    cpu[0] += time.thread_time() - call
+                if inspect.isawaitable(result):
+                    result = await _cpu_timed(result, cpu)
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.called(
+                    pack,
+                    wall=time.perf_counter() - start,
+                    cpu=cpu[0],
+                    depend=start - dispatch_start if dispatch_start else 0.0,
+                    error=error,
+                )
+
+        __accounted.__accounted__ = True
+        return __accounted
+
+    def instrument(self, pack: str, schema: ListenerSchema, func: Callable) -> Callable:
+        """
+        Add a dispatch marker in front of the schema's decorators and wrap the listener.
+
+        :param pack: Module pack.
+        :param schema: Listener schema, modified in place.
+        :param func: Listener callable.
+        :return: Wrapped callable.
+        """
+
+        if getattr(func, "__accounted__", False):
+            return func
+        schema.decorators.insert(0, Depend(lambda: self.dispatched(pack)))
+        return self.wrap(pack, func)
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        """
+        Get statistics of every module, sorted by total wall time.
+
+        :return: Dict of module pack to its statistics.
+        """
+
+        return dict(
+            sorted(
+                (
+                    (
+                        pack,
+                        {**record, "filtered": record["dispatched"] - record["calls"]},
+                    )
+                    for pack, record in self.__stats.items()
+                ),
+                key=lambda x: x[1]["wall"],
+                reverse=True,
+            )
+        )
+
+    def dump(self) -> Path:
+        """
+        Write the statistics as JSON.
+
+        :return: Path of the written file.
+        """
+
+        atomic_write(self.__path, json.dumps(self.stats(), indent=4))
+        return self.__path
+
+    def reset(self):
+        """
+        Clear all statistics.
+
+        :return: None.
+        """
+
+        self.__stats.clear()
+
+
+accounting = PluginAccounting()
+
+
+class AccountingBehaviour(Behaviour):
+    """
+    Saya behaviour instrumenting listener cubes before they are allocated,
+    must be installed in front of BroadcastBehaviour.
+    """
+
+    def allocate(self, cube: Cube) -> None:
+        if isinstance(cube.metaclass, ListenerSchema):
+            pack = ".".join(cube.content.__module__.split(".", maxsplit=2)[:2])
+            cube.content = accounting.instrument(pack, cube.metaclass, cube.content)
+        return None
+
+    def release(self, cube: Cube) -> None:
+        return None
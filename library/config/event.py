@@ -0,0 +1,102 @@
+from typing import Any, Callable, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+
+class ConfigEvent(BaseModel):
+    """
+    Base class of config change events.
+    """
+
+
+class ConfigChanged(ConfigEvent):
+    """
+    A top-level section of config.json changed.
+    """
+
+    section: str
+    """ Name of the section, e.g. func, owners """
+
+    old: Any = None
+    """ JSON value of the section before the change """
+
+    new: Any = None
+    """ JSON value of the section after the change """
+
+
+class SwitchChanged(ConfigEvent):
+    """
+    Stored switch values of a module changed in switch.json.
+    """
+
+    pack: str
+    """ Module pack """
+
+    groups: list[str] = []
+    """ Groups whose value changed """
+
+
+class GroupConfigChanged(ConfigEvent):
+    """
+    The group config shard of a group changed on disk.
+    """
+
+    group: int
+    """ Group id """
+
+
+_E = TypeVar("_E", bound=ConfigEvent)
+
+
+class ConfigEventBus:
+    """
+    Synchronous publish/subscribe for config change events.
+    """
+
+    __instance: "ConfigEventBus" = None
+    __subscribers: dict[type[ConfigEvent], list[Callable[[ConfigEvent], Any]]]
+
+    def __init__(self):
+        self.__subscribers = {}
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def subscribe(
+        self, event: type[_E], callback: Callable[[_E], Any] = None
+    ) -> Callable[[_E], Any]:
+        """
+        Subscribe to an event type, can be used as a decorator.
+
+        :param event: Event type, subclasses are delivered as well.
+        :param callback: Callable receiving the event.
+        :return: The callback.
+        """
+
+        if callback is None:
+            return lambda _callback: self.subscribe(event, _callback)
+        self.__subscribers.setdefault(event, []).append(callback)
+        return callback
+
+    def publish(self, event: ConfigEvent):
+        """
+        Deliver an event to its subscribers, exceptions are logged.
+
+        :param event: Event instance.
+        :return: None.
+        """
+
+        for event_type, callbacks in self.__subscribers.items():
+            if not isinstance(event, event_type):
+                continue
+            for callback in callbacks:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.exception(e)
+
+
+config_events = ConfigEventBus()
@@ -1,38 +1,131 @@
 import json
+import threading
+from collections import ChainMap, OrderedDict
+from copy import deepcopy
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 
 from graia.ariadne.model import Group
+from loguru import logger
 
 from library.config import config
 from library.model import Module
+from library.storage import DebouncedBatchWriter, atomic_write
 
 
 class GroupConfig:
+    """
+    Group config, stored as one shard file per group and loaded lazily
+    on first access, with an LRU of hot groups kept in memory.
+
+    Each group only stores the keys that differ from the module template.
+    Reads return a read-only view layering the delta over the template,
+    changes must go through update(), which marks the group's shard for
+    the next batched write shared by all groups.
+    """
+
     __instance: "GroupConfig" = None
-    __cache: dict[int, dict[str, dict]] = {}
+    __cache: OrderedDict[int, dict[str, dict]]
+    __signatures: dict[int, tuple[int, int] | None]
     __template: dict[str, dict]
+    __writer: DebouncedBatchWriter
+    __pending: dict[int, str]
+    __lock: threading.Lock
+    __directory: Path = Path(config.path.data, "library", "group_config")
+    __legacy_path: Path = Path(config.path.data, "library", "group_config.json")
+    __capacity: int = 1024
 
     def __init__(self):
-        self.__load()
+        self.__cache = OrderedDict()
+        self.__signatures = {}
+        self.__template = {}
+        self.__writer = DebouncedBatchWriter(
+            self.__shard, self.__serialize, on_written=self.__written
+        )
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.__migrate()
 
     def __new__(cls, *args, **kwargs):
         if cls.__instance is None:
             cls.__instance = super().__new__(cls)
         return cls.__instance
 
-    def __load(self):
-        if not Path(config.path.data, "library", "group_config.json").is_file():
-            self.__save()
-        with Path(config.path.data, "library", "group_config.json").open(
-            "r", encoding="utf-8"
-        ) as f:
-            self.__cache = json.loads(f.read())
+    def __migrate(self):
+        """
+        Split the legacy single-file group config into shards.
+        """
 
-    def __save(self):
-        with Path(config.path.data, "library", "group_config.json").open(
-            "w", encoding="utf-8"
-        ) as f:
-            f.write(json.dumps(self.__cache, indent=4, ensure_ascii=False))
+        if not self.__legacy_path.is_file():
+            return
+        with self.__legacy_path.open("r", encoding="utf-8") as f:
+            legacy: dict[str, dict] = json.loads(f.read())
+        for group, data in legacy.items():
+            if data:
+                atomic_write(
+                    self.__shard(int(group)),
+                    json.dumps(data, indent=4, ensure_ascii=False),
+                )
+        self.__legacy_path.rename(self.__legacy_path.with_suffix(".json.bak"))
+        logger.success(f"Migrated {len(legacy)} group configs to {self.__directory}")
+
+    def __shard(self, group: int) -> Path:
+        return Path(self.__directory, f"{group}.json")
+
+    def __signature(self, group: int) -> tuple[int, int] | None:
+        try:
+            stat = self.__shard(group).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def __load(self, group: int) -> dict[str, dict]:
+        if (gc := self.__cache.get(group, None)) is not None:
+            self.__cache.move_to_end(group)
+            return gc
+        with self.__lock:
+            pending = self.__pending.get(group, None)
+        if pending is not None:
+            gc = json.loads(pending) if pending else {}
+        elif (path := self.__shard(group)).is_file():
+            with path.open("r", encoding="utf-8") as f:
+                gc = json.loads(f.read())
+        else:
+            gc = {}
+        self.__cache[group] = gc
+        self.__signatures[group] = self.__signature(group)
+        if len(self.__cache) > self.__capacity:
+            evicted, _ = self.__cache.popitem(last=False)
+            self.__signatures.pop(evicted, None)
+        return gc
+
+    def __serialize(self, group: int) -> str | None:
+        with self.__lock:
+            payload = self.__pending.get(group, None)
+        if payload is None:
+            return None
+        if not payload:
+            self.__shard(group).unlink(missing_ok=True)
+            self.__written(group, payload)
+            return None
+        return payload
+
+    def __written(self, group: int, data: str):
+        with self.__lock:
+            if self.__pending.get(group, None) == data:
+                del self.__pending[group]
+        if group in self.__cache:
+            self.__signatures[group] = self.__signature(group)
+
+    def __save(self, group: int):
+        gc = self.__cache.get(group, None)
+        with self.__lock:
+            self.__pending[group] = (
+                json.dumps(gc, indent=4, ensure_ascii=False) if gc else ""
+            )
+        self.__writer.schedule(group)
 
     @staticmethod
     def __type_convert(value: int | str | Group | Module) -> int | str:
@@ -47,20 +140,65 @@ class GroupConfig:
         module: str = self.__type_convert(module)
         self.__template[module] = data
 
-    def get(self, group: int | Group, module: str | Module) -> dict | None:
+    def __delta(self, module: str, data: dict) -> dict:
+        template = self.__template.get(module, {})
+        return {
+            key: value
+            for key, value in data.items()
+            if key not in template or template[key] != value
+        }
+
+    def __view(self, module: str, delta: dict) -> Mapping:
+        return MappingProxyType(ChainMap(delta, self.__template.get(module, {})))
+
+    def evict(self, group: int | Group | None = None):
+        """
+        Drop cached group configs, they are read again from storage on next access.
+
+        :param group: Group id or Group object, None for all groups.
+        :return: None.
+        """
+
+        if group is None:
+            self.__cache.clear()
+            self.__signatures.clear()
+            return
+        group = int(self.__type_convert(group))
+        self.__cache.pop(group, None)
+        self.__signatures.pop(group, None)
+
+    def reload_changed(self) -> list[int]:
+        """
+        Evict cached groups whose shard was changed on disk by someone else.
+
+        :return: Ids of evicted groups.
+        """
+
+        with self.__lock:
+            pending = set(self.__pending)
+        changed = [
+            group
+            for group, signature in list(self.__signatures.items())
+            if group not in pending and self.__signature(group) != signature
+        ]
+        for group in changed:
+            self.evict(group)
+        return changed
+
+    def get(self, group: int | Group, module: str | Module) -> Mapping | None:
         """
         Get group config, if not exists, will return None.
 
         :param group: Group id or Group object.
         :param module: Module pack or Module object.
-        :return: Group config, or None if not found.
+        :return: Read-only view of the group config over the module template, or None if not found.
         """
 
-        group = self.__type_convert(group)
-        if (gc := self.__cache.get(group, None)) is None:
-            return
-        module: dict | None = gc.get(module, None)
-        return module
+        group: int = int(self.__type_convert(group))
+        module: str = self.__type_convert(module)
+        if (delta := self.__load(group).get(module, None)) is None:
+            return None
+        return self.__view(module, delta)
 
     def update(
         self,
@@ -71,7 +209,8 @@ class GroupConfig:
         value: str = None,
     ) -> None:
         """
-        Update group config.
+        Update group config, only keys differing from the template are stored
+        and only the shard of the group is written, after a short delay.
 
         :param group: Group id or Group object.
         :param module: Module pack or Module object.
@@ -81,27 +220,36 @@ class GroupConfig:
         :return: None.
         """
 
-        group: int = self.__type_convert(group)
+        group: int = int(self.__type_convert(group))
         module: str = self.__type_convert(module)
+        gc = self.__load(group)
         if data is None:
-            if group not in self.__cache.keys() or module not in self.__cache.keys():
+            if module not in gc:
                 return
-            del self.__cache[group][module]
-            return
-        if key and value:
-            self.__cache[group][module][key] = value
-
-    def get_or_update(self, group: int | Group, module: str | Module) -> dict:
+            del gc[module]
+        elif key is not None:
+            delta = gc.setdefault(module, self.__delta(module, deepcopy(data)))
+            template = self.__template.get(module, {})
+            if key in template and template[key] == value:
+                delta.pop(key, None)
+            else:
+                delta[key] = deepcopy(value)
+        else:
+            gc[module] = self.__delta(module, deepcopy(data))
+        self.__save(group)
+
+    def get_or_update(self, group: int | Group, module: str | Module) -> Mapping:
         """
         Get group config, if not exists, will create a new one.
 
         :param group: Group id or Group object.
         :param module: Module pack or Module object.
-        :return: Group config.
+        :return: Read-only view of the group config over the module template.
         """
 
-        group: int = self.__type_convert(group)
+        group: int = int(self.__type_convert(group))
         module: str = self.__type_convert(module)
-        if isinstance(cfg := self.get(group, module), dict):
+        if (cfg := self.get(group, module)) is not None:
             return cfg
-        self.update(group, module, self.__template.get(module, None))
+        self.update(group, module, {})
+        return self.get(group, module)
@@ -1,30 +1,73 @@
 import json
+import time
 from pathlib import Path
 
 from pydantic import BaseModel
 
 from library import config
+from library.storage import DebouncedWriter
 
 
 class ModuleConfig:
+    """
+    Module config, one JSON file per chunk under the module's config directory.
+
+    Chunks are loaded on first access and revalidated against the file's
+    mtime and size, so external edits are picked up without a restart.
+    """
+
     __instance: "ModuleConfig" = None
-    __cache: dict[str, dict]
+    __cache: dict[tuple[str, str], tuple[int, int, dict]]
+    __checked: dict[tuple[str, str], float]
+    __writers: dict[tuple[str, str], DebouncedWriter]
+    __pending: dict[tuple[str, str], str]
+    __revalidate_interval: float = 1.0
 
     def __init__(self):
         self.__cache = {}
-        for module in Path(config.path.config).iterdir():
-            if module.is_dir():
-                self.__cache[module.name] = {}
-                for file in module.iterdir():
-                    if file.is_file() and file.suffix == ".json":
-                        with file.open("r", encoding="utf-8") as f:
-                            self.__cache[module.name][file.stem] = json.load(f)
+        self.__checked = {}
+        self.__writers = {}
+        self.__pending = {}
 
     def __new__(cls, *args, **kwargs):
         if not cls.__instance:
             cls.__instance = super().__new__(cls)
         return cls.__instance
 
+    @staticmethod
+    def __path(module: str, chunk: str) -> Path:
+        return Path(config.path.config, module, f"{chunk}.json")
+
+    def __writer(self, module: str, chunk: str) -> DebouncedWriter:
+        if (writer := self.__writers.get((module, chunk), None)) is None:
+            writer = DebouncedWriter(
+                self.__path(module, chunk),
+                lambda: self.__pending[(module, chunk)],
+            )
+            self.__writers[(module, chunk)] = writer
+        return writer
+
+    def __load(self, module: str, chunk: str) -> dict | None:
+        key = (module, chunk)
+        cached = self.__cache.get(key, None)
+        now = time.monotonic()
+        if cached and now - self.__checked.get(key, 0) < self.__revalidate_interval:
+            return cached[2]
+        if (writer := self.__writers.get(key, None)) and writer.dirty:
+            return cached[2]
+        self.__checked[key] = now
+        try:
+            stat = self.__path(module, chunk).stat()
+        except FileNotFoundError:
+            self.__cache.pop(key, None)
+            return None
+        if cached and (cached[0], cached[1]) == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with self.__path(module, chunk).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.__cache[key] = (stat.st_mtime_ns, stat.st_size, data)
+        return data
+
     def update(
         self,
         module: str,
@@ -32,21 +75,38 @@ class ModuleConfig:
         chunk: str = "main",
         key: str = None,
     ):
+        """
+        Update module config, the file is written atomically in a worker thread.
+
+        :param module: Module pack.
+        :param data: Data of the chunk, or value of the key if key is given.
+        :param chunk: Chunk name.
+        :param key: Key to update.
+        :return: None.
+        """
+
         data = data.dict() if isinstance(data, BaseModel) else data
-        if module not in self.__cache:
-            self.__cache[module] = {}
-        if key and chunk in self.__cache[module]:
-            self.__cache[module][chunk][key] = data
-        else:
-            self.__cache[module][chunk] = data
-        module_dir = Path(config.path.config, module)
-        module_dir.mkdir(exist_ok=True)
-        with Path(module_dir, f"{chunk}.json").open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        current = self.__load(module, chunk)
+        if key and isinstance(current, dict):
+            current[key] = data
+            data = current
+        mtime, size, _ = self.__cache.get((module, chunk), (0, 0, None))
+        self.__cache[(module, chunk)] = (mtime, size, data)
+        self.__pending[(module, chunk)] = json.dumps(data, indent=4)
+        self.__writer(module, chunk).schedule()
 
     def get(self, module: str, chunk: str = "main", key: str = None):
-        if module in self.__cache and chunk in self.__cache[module]:
-            if key:
-                return self.__cache[module][chunk].get(key, None)
-            return self.__cache[module][chunk]
-        return None
+        """
+        Get module config.
+
+        :param module: Module pack.
+        :param chunk: Chunk name.
+        :param key: Key to get.
+        :return: Data of the chunk, value of the key, or None if not found.
+        """
+
+        if (data := self.__load(module, chunk)) is None:
+            return None
+        if key:
+            return data.get(key, None)
+        return data
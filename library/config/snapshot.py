@@ -0,0 +1,118 @@
+import re
+from typing import NoReturn
+
+from pydantic import BaseModel
+
+from library.config import config
+from library.config.event import ConfigChanged, config_events
+
+
+class ConfigSnapshot(BaseModel):
+    """
+    Immutable view of the config values read on every message, with derived
+    structures precomputed. A new snapshot with a higher version replaces
+    the current one whenever a relevant section changes.
+    """
+
+    version: int
+    """ Increases by one on every rebuild """
+
+    owners: frozenset[int]
+    """ Bot owners """
+
+    default: bool
+    """ Default switch value """
+
+    notice: bool
+    """ Whether to notice when a module is switched off """
+
+    notice_msg: str | None
+    """ Notice message """
+
+    prefix: tuple[str, ...]
+    """ Command prefixes """
+
+    prefix_pattern: re.Pattern
+    """ Compiled pattern matching any of the prefixes at the start of a text, empty if there are none """
+
+    class Config:
+        frozen = True
+        arbitrary_types_allowed = True
+
+    def strip_prefix(self, text: str) -> str | None:
+        """
+        Strip the command prefix from a text.
+
+        :param text: Text to strip.
+        :return: Text without prefix, or None if the text has no prefix.
+        """
+
+        if match := self.prefix_pattern.match(text):
+            return text[match.end() :]
+        return None
+
+
+def build_snapshot(version: int) -> ConfigSnapshot:
+    """
+    Build a snapshot from the current config.
+
+    :param version: Version of the snapshot.
+    :return: ConfigSnapshot.
+    """
+
+    prefix = tuple(config.func.prefix)
+    return ConfigSnapshot(
+        version=version,
+        owners=frozenset(config.owners),
+        default=config.func.default,
+        notice=config.func.notice,
+        notice_msg=config.func.notice_msg,
+        prefix=prefix,
+        prefix_pattern=re.compile(
+            "|".join(map(re.escape, sorted(prefix, key=len, reverse=True)))
+            if prefix
+            else ""
+        ),
+    )
+
+
+__current: ConfigSnapshot = build_snapshot(0)
+
+
+def snapshot() -> ConfigSnapshot:
+    """
+    Get the current config snapshot.
+
+    :return: ConfigSnapshot.
+    """
+
+    return __current
+
+
+@config_events.subscribe(ConfigChanged)
+def refresh_snapshot(event: ConfigChanged = None) -> ConfigSnapshot:
+    """
+    Replace the current snapshot with a new version.
+
+    :param event: The change that caused the refresh, sections that are not
+    part of the snapshot are ignored.
+    :return: The new snapshot.
+    """
+
+    global __current
+    if event is not None and event.section not in {"owners", "func"}:
+        return __current
+    __current = build_snapshot(__current.version + 1)
+    return __current
+
+
+@config.on_save
+def refresh_saved_snapshot() -> NoReturn:
+    """
+    Rebuild the snapshot if a save carries in-memory changes to its sections.
+
+    :return: None.
+    """
+
+    if build_snapshot(__current.version) != __current:
+        refresh_snapshot()
@@ -6,7 +6,7 @@ from graia.ariadne.message.chain import MessageChain
 from graia.broadcast import ExecutionStop
 from graia.broadcast.builtin.decorators import Depend
 
-from library import config
+from library.config.snapshot import snapshot
 from library.model import UserPerm
 
 
@@ -44,7 +44,7 @@ class Permission:
         :return: True if user has permission, False otherwise.
         """
 
-        if event.sender.id in config.owners:
+        if event.sender.id in snapshot().owners:
             user_perm = UserPerm.BOT_OWNER
         elif isinstance(event, GroupMessage):
             user_perm = getattr(UserPerm, str(event.sender.permission))
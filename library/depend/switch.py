@@ -7,7 +7,7 @@ from graia.broadcast import ExecutionStop
 from graia.broadcast.builtin.decorators import Depend
 from loguru import logger
 
-from library import config
+from library.config.snapshot import snapshot
 from library.depend import Permission
 from library.model import UserPerm
 from library.util.switch import switch
@@ -42,35 +42,26 @@ class Switch:
                     logger.success(f"[Switch] {pack}: Overridden by {override_level}")
                 return
             try:
-                value = switch.get(
-                    pack=pack,
-                    group=event.sender.group
-                    if isinstance(event, GroupMessage)
-                    else None,
+                value = switch.resolve(
+                    pack,
+                    event.sender.group if isinstance(event, GroupMessage) else None,
                 )
-                if isinstance(value, bool):
-                    if log:
-                        logger.success(f"[Switch] {pack}: {value}")
-                    if not value:
-                        raise ExecutionStop
-                    return
                 if log:
-                    logger.success(
-                        f"[Switch] {pack}: Fallback to {config.func.default}"
-                    )
-                if not config.func.default:
+                    logger.success(f"[Switch] {pack}: {value}")
+                if not value:
                     raise ExecutionStop
             except ExecutionStop:
                 if no_notice:
                     raise
-                if on_failure or config.func.notice:
+                current = snapshot()
+                if on_failure or current.notice:
                     await Ariadne.current().send_message(
                         event.sender.group
                         if isinstance(event, GroupMessage)
                         else event.sender,
                         on_failure.as_sendable()
                         if on_failure
-                        else config.func.notice_msg.format(module=modules.get(pack)),
+                        else current.notice_msg.format(module=modules.get(pack)),
                     )
                 raise
 
@@ -86,8 +77,6 @@ class Switch:
         :return: Whether the switch is on.
         """
 
-        value = switch.get(
-            pack=pack,
-            group=event.sender.group if isinstance(event, GroupMessage) else None,
+        return switch.resolve(
+            pack, event.sender.group if isinstance(event, GroupMessage) else None
         )
-        return value if isinstance(value, bool) else config.func.default
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NoReturn, TypeVar
+
+from library.config import config
+
+_T = TypeVar("_T")
+
+
+class BoundedExecutor:
+    """
+    Named thread pool with a bounded number of queued calls, callers over
+    the limit wait on the event loop instead of piling up in the pool.
+    """
+
+    __pool: ThreadPoolExecutor
+    __semaphore: asyncio.Semaphore
+    __lock: threading.Lock
+    __metrics: dict[str, int | float]
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.__pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"executor-{name}"
+        )
+        self.__semaphore = asyncio.Semaphore(max_workers + max_queue)
+        self.__lock = threading.Lock()
+        self.__metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "waiting": 0,
+            "queued": 0,
+            "active": 0,
+            "wait": 0.0,
+            "run": 0.0,
+        }
+
+    def __update(self, **kwargs: int | float) -> NoReturn:
+        with self.__lock:
+            for key, value in kwargs.items():
+                self.__metrics[key] += value
+
+    def __call(self, queued_at: float, func: Callable[[], _T]) -> _T:
+        start = time.perf_counter()
+        self.__update(queued=-1, active=1, wait=start - queued_at)
+        try:
+            result = func()
+        except Exception:
+            self.__update(active=-1, failed=1, run=time.perf_counter() - start)
+            raise
+        self.__update(active=-1, completed=1, run=time.perf_counter() - start)
+        return result
+
+    async def run(self, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+        """
+        Run a blocking callable in the pool.
+
+        :param func: Callable.
+        :param args: Positional arguments.
+        :param kwargs: Keyword arguments.
+        :return: Result of the callable.
+        """
+
+        self.__update(waiting=1)
+        async with self.__semaphore:
+            self.__update(waiting=-1, submitted=1, queued=1)
+            return await asyncio.get_running_loop().run_in_executor(
+                self.__pool,
+                self.__call,
+                time.perf_counter(),
+                functools.partial(func, *args, **kwargs),
+            )
+
+    def metrics(self) -> dict[str, int | float]:
+        """
+        Get a copy of the metrics.
+
+        :return: Dict of counters, queue gauges and total wait and run seconds.
+        """
+
+        with self.__lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                **self.__metrics,
+            }
+
+    def shutdown(self, wait: bool = True) -> NoReturn:
+        """
+        Shut down the pool.
+
+        :param wait: Wait for running calls.
+        :return: None.
+        """
+
+        self.__pool.shutdown(wait=wait)
+
+
+class ExecutorRegistry:
+    """
+    Registry of named bounded executors, one per plugin or subsystem.
+    """
+
+    __instance: "ExecutorRegistry" = None
+    __executors: dict[str, BoundedExecutor]
+
+    def __init__(self):
+        self.__executors = {}
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def get(
+        self, name: str, max_workers: int = None, max_queue: int = None
+    ) -> BoundedExecutor:
+        """
+        Get an executor by name, created on first use with sizes from config.
+
+        :param name: Executor name, e.g. a module pack or a subsystem.
+        :param max_workers: Worker threads, overrides config when creating.
+        :param max_queue: Calls allowed to wait for a worker, overrides config when creating.
+        :return: BoundedExecutor.
+        """
+
+        if (executor := self.__executors.get(name, None)) is None:
+            executor = self.__executors[name] = BoundedExecutor(
+                name,
+                (
+                    max_workers
+                    if max_workers is not None
+                    else config.executor.workers.get(name, config.executor.max_workers)
+                ),
+                max_queue if max_queue is not None else config.executor.max_queue,
+            )
+        return executor
+
+    async def run(self, name: str, func: Callable[..., _T], *args, **kwargs) -> _T:
+        """
+        Run a blocking callable in a named executor.
+
+        :param name: Executor name.
+        :param func: Callable.
+        :param args: Positional arguments.
+        :param kwargs: Keyword arguments.
+        :return: Result of the callable.
+        """
+
+        return await self.get(name).run(func, *args, **kwargs)
+
+    def metrics(self) -> dict[str, dict[str, int | float]]:
+        """
+        Get metrics of every executor.
+
+        :return: Dict of executor name to its metrics.
+        """
+
+        return {name: executor.metrics() for name, executor in self.__executors.items()}
+
+    def shutdown(self) -> NoReturn:
+        """
+        Shut down every executor.
+
+        :return: None.
+        """
+
+        for executor in self.__executors.values():
+            executor.shutdown(wait=False)
+        self.__executors.clear()
+
+
+executors = ExecutorRegistry()
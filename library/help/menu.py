@@ -1,4 +1,3 @@
-import asyncio
 import itertools
 import pickle
 from pathlib import Path
@@ -6,6 +5,7 @@ from pathlib import Path
 from PIL import Image
 
 from library import config
+from library.executor import executors
 from library.image import IconUtil
 from library.image.oneui_mock.color import Color
 from library.image.oneui_mock.elements import (
@@ -82,6 +82,7 @@ class HelpMenu:
         for box_list, _ in itertools.product(boxes.values(), categories):
             box_list.append(MenuBox())
         box_cord = {key: value for value, key in enumerate(categories)}
+        enabled = set(switch.matrix.enabled_modules(self.field))
 
         for module in modules:
             if module.hidden:
@@ -91,8 +92,7 @@ class HelpMenu:
             offset = 0
             if not module.loaded:
                 offset = 2
-            status = self.__get_switch(module.pack, self.field)
-            status = int(status) + offset
+            status = int(module.pack in enabled) + offset
             boxes[status][box_index].add(
                 module.name, module.description or "暂无描述", icon, COLOR_PALETTE[status]
             )
@@ -101,17 +101,9 @@ class HelpMenu:
         box_list = [*boxes[0], *boxes[1], *boxes[2], *boxes[3]]
         return [box for box in box_list if box.has_content()]
 
-    @staticmethod
-    def __get_switch(module: str, field: int) -> bool:
-        if (status := switch.get(module, field)) is None:
-            status = config.func.default
-        return status
-
     def compose_module_summary_box(self) -> MenuBox:
         total = len(modules)
-        enabled = len(
-            [module for module in modules if self.__get_switch(module.pack, self.field)]
-        )
+        enabled = switch.matrix.count_enabled(self.field)
         hidden = len([module for module in modules if module.hidden])
         unloaded = len([module for module in modules if not module.loaded])
 
@@ -214,22 +206,19 @@ class HelpMenu:
         return menu.render()
 
     async def async_compose(self) -> Image.Image:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.compose)
+        return await executors.run("help", self.compose)
 
     def get_mock(self) -> OneUIMock:
         return OneUIMock(*self.compose_columns(), dark=self.dark)
 
     async def async_get_mock(self) -> OneUIMock:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.get_mock)
+        return await executors.run("help", self.get_mock)
 
     def get_html(self) -> str:
         return self.get_mock().generate_html()
 
     async def async_get_html(self) -> str:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.get_html)
+        return await executors.run("help", self.get_html)
 
     @classmethod
     def register_box(cls, *elements: Box | Image.Image):
@@ -47,9 +47,7 @@ class ModuleHelp:
                         prefix=config.func.prefix[0] if config.func.prefix else ""
                     ),
                 )
-            _switch = switch.get(self.module.pack, field)
-            if _switch is None:
-                _switch = config.func.default
+            _switch = switch.resolve(self.module, field)
             return OneUIMock(
                 Column(
                     About(
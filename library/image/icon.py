@@ -1,9 +1,10 @@
-import asyncio
 from pathlib import Path
 
 import numpy as np
 from PIL import Image
 
+from library.executor import executors
+
 
 class IconUtil:
     def __int__(self):
@@ -52,8 +53,7 @@ class IconUtil:
         :return: Image of the icon, may be transparent if icon is not found
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.get_icon, icon, size, color)
+        return await executors.run("image", cls.get_icon, icon, size, color)
 
     @staticmethod
     def replace_color(icon: Image.Image, color: tuple[int, int, int]):
@@ -83,5 +83,4 @@ class IconUtil:
         :return: Icon with the specified color
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.replace_color, icon, color)
+        return await executors.run("image", cls.replace_color, icon, color)
@@ -1,9 +1,10 @@
-import asyncio
 from pathlib import Path
 
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
 from loguru import logger
 
+from library.executor import executors
+
 DEFAULT_FONT = "HarmonyOS_Sans_SC_Regular.ttf"
 
 
@@ -46,9 +47,8 @@ class ImageUtil:
         :return: Image object
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, cls.paste_to_center, image, paste_image, x, y
+        return await executors.run(
+            "image", cls.paste_to_center, image, paste_image, x, y
         )
 
     @staticmethod
@@ -84,8 +84,7 @@ class ImageUtil:
         :return: Image with rounded corners
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.round_corners, img, radius)
+        return await executors.run("image", cls.round_corners, img, radius)
 
     @staticmethod
     def crop_to_rect(img: Image.Image):
@@ -116,8 +115,7 @@ class ImageUtil:
         :return: Cropped image
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.crop_to_rect, img)
+        return await executors.run("image", cls.crop_to_rect, img)
 
     @classmethod
     def crop_to_circle(cls, img: Image.Image):
@@ -142,8 +140,7 @@ class ImageUtil:
         :return: Image cropped to a circle
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.crop_to_circle, img)
+        return await executors.run("image", cls.crop_to_circle, img)
 
     @classmethod
     def blur(cls, img: Image.Image, radius: int, boarder: bool = True):
@@ -178,8 +175,7 @@ class ImageUtil:
         :return: Image blurred
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, cls.blur, img, radius, boarder)
+        return await executors.run("image", cls.blur, img, radius, boarder)
 
     @classmethod
     def get_shadow(cls, img: Image.Image, radius: int, opacity: int = 50):
@@ -226,9 +222,8 @@ class ImageUtil:
         :return: Image with a blurred shadow
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, cls.add_blurred_shadow, img, radius, opacity
+        return await executors.run(
+            "image", cls.add_blurred_shadow, img, radius, opacity
         )
 
     @classmethod
@@ -258,10 +253,7 @@ class ImageUtil:
         :return: Image with a drop shadow
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, cls.add_drop_shadow, img, radius, opacity
-        )
+        return await executors.run("image", cls.add_drop_shadow, img, radius, opacity)
 
     @classmethod
     def draw_rectangle(
@@ -326,9 +318,8 @@ class ImageUtil:
         :return: Image with a rectangle
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
+        return await executors.run(
+            "image",
             cls.draw_rectangle,
             img,
             x,
@@ -421,7 +412,6 @@ class ImageUtil:
         :return: Image with a line
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, cls.draw_line, img, x1, y1, x2, y2, color, width
+        return await executors.run(
+            "image", cls.draw_line, img, x1, y1, x2, y2, color, width
         )
@@ -1,10 +1,11 @@
-import asyncio
 import re
 import string
 from typing import Literal
 
 from PIL import ImageDraw, ImageFont, Image
 
+from library.executor import executors
+
 from .image import ImageUtil
 
 
@@ -114,10 +115,7 @@ class TextUtil:
         :return: image
         """
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, cls.render_text, text, width, color, font
-        )
+        return await executors.run("image", cls.render_text, text, width, color, font)
 
     @classmethod
     def get_index_location(
@@ -1,10 +1,13 @@
 import json
 from enum import Enum
 from pathlib import Path
-from typing import NoReturn
+from typing import NoReturn, Literal, Any, Callable
 
 from loguru import logger
-from pydantic import BaseModel, AnyHttpUrl, root_validator, validator
+from pydantic import BaseModel, AnyHttpUrl, root_validator, validator, ValidationError
+from pydantic.json import pydantic_encoder
+
+from library.storage import DebouncedWriter
 
 
 class HubMetadata(BaseModel):
@@ -27,6 +30,7 @@ class HubMetadata(BaseModel):
     module_metadata: str = ""
     download_module: str = ""
     search_module: str = ""
+    bulk_version: str = ""
 
     def __new__(cls, *args, **kwargs):
         if cls.__instance is None:
@@ -46,6 +50,17 @@ class HubConfig(BaseModel):
     secret: str = ""
     meta: str = "/metadata"
     metadata: None | HubMetadata = None
+    cache_size: int = 256 * 1024 * 1024
+    concurrency: int = 4
+    version_ttl: int = 300
+    timeout: float = 10
+    connect_timeout: float = 5
+    retries: int = 3
+    backoff: float = 0.5
+    backoff_max: float = 10
+    connection_limit: int = 16
+    keepalive: float = 30
+    require_checksum: bool = False
 
     def __new__(cls, *args, **kwargs):
         if cls.__instance is None:
@@ -57,6 +72,8 @@ class HubConfig(BaseModel):
         assert not (
             values.get("enabled", False) and values.get("secret", "") == ""
         ), "Hub config is enabled but secret is not set"
+        assert values.get("concurrency", 1) > 0, "Hub concurrency must be positive"
+        assert values.get("retries", 0) >= 0, "Hub retries must not be negative"
         if not values.get("enabled", False):
             values["metadata"] = None
         elif values.get("metadata") is None:
@@ -128,6 +145,74 @@ class FunctionConfig(BaseModel):
         return values
 
 
+class IntervalConfig(BaseModel):
+    """
+    Configuration for interval.
+    """
+
+    __instance: "IntervalConfig" = None
+
+    backend: Literal["pickle", "sqlite"] = "pickle"
+    database: Path | None = None
+    flush_interval: float = 1.0
+    batch_size: int = 64
+    busy_timeout: float = 0.5
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @root_validator()
+    def interval_check(cls, values: dict):
+        assert values.get("flush_interval", 0) > 0, "flush_interval must be positive"
+        assert values.get("batch_size", 0) > 0, "batch_size must be positive"
+        assert values.get("busy_timeout", 0) >= 0, "busy_timeout must not be negative"
+        return values
+
+
+class LoaderConfig(BaseModel):
+    """
+    Configuration for module loader.
+    """
+
+    __instance: "LoaderConfig" = None
+
+    profile: bool = False
+    lazy: bool = False
+    prefetch_workers: int = 4
+    wheelhouse: Path | None = None
+    hot_reload: bool = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+
+class ExecutorConfig(BaseModel):
+    """
+    Configuration for named executors.
+    """
+
+    __instance: "ExecutorConfig" = None
+
+    max_workers: int = 4
+    max_queue: int = 64
+    workers: dict[str, int] = {}
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @root_validator()
+    def executor_check(cls, values: dict):
+        assert values.get("max_workers", 0) > 0, "max_workers must be positive"
+        assert values.get("max_queue", -1) >= 0, "max_queue must not be negative"
+        return values
+
+
 class MySQLConfig(BaseModel):
     """
     Configuration for MySQL.
@@ -205,6 +290,10 @@ class NConfig(BaseModel):
     """
 
     __instance: "NConfig" = None
+    __path: Path = Path(Path().resolve(), "config.json")
+    __writer: DebouncedWriter = None
+    __last_saved: str | None = None
+    __save_hooks: list[Callable[[], Any]] = []
 
     name: str = ""
     num: int = 0
@@ -221,6 +310,9 @@ class NConfig(BaseModel):
     func: FunctionConfig = FunctionConfig()
     path: PathConfig = PathConfig()
     hub: HubConfig = HubConfig()
+    interval: IntervalConfig = IntervalConfig()
+    loader: LoaderConfig = LoaderConfig()
+    executor: ExecutorConfig = ExecutorConfig()
 
     def __init__(self):
         self.__init_check()
@@ -245,35 +337,101 @@ class NConfig(BaseModel):
 
     @staticmethod
     def __load():
-        with Path(Path().resolve(), "config.json").open("r", encoding="utf-8") as _f:
-            return json.loads(_f.read())
+        with NConfig.__path.open("r", encoding="utf-8") as _f:
+            NConfig.__last_saved = _f.read()
+        return json.loads(NConfig.__last_saved)
 
     def __init_check(self):
-        if not Path(Path().resolve(), "config.json").exists():
+        if not self.__path.exists():
             super().__init__()
-            self.save()
+            self.save(immediate=True)
             logger.success("Created config.json using initial values")
             logger.success("Modify essential fields in config.json to continue")
             exit(-1)
 
-    def save(self) -> NoReturn:
+    def __serialize(self) -> str | None:
+        content = self.json(indent=4, ensure_ascii=False)
+        if content == NConfig.__last_saved:
+            return None
+        return content
+
+    @staticmethod
+    def __written(content: str) -> NoReturn:
+        NConfig.__last_saved = content
+
+    @property
+    def dirty(self) -> bool:
         """
-        Save config to config.json.
+        Whether there are changes waiting to be written to config.json.
 
-        :return: NoReturn
+        :return: bool
+        """
+
+        return NConfig.__writer is not None and NConfig.__writer.dirty
+
+    @staticmethod
+    def on_save(callback: Callable[[], Any]) -> Callable[[], Any]:
+        """
+        Register a callable run on every save, e.g. to rebuild state derived
+        from in-memory changes.
+
+        :param callback: Callable without arguments.
+        :return: The callable.
         """
 
-        with Path(Path().resolve(), "config.json").open("w", encoding="utf-8") as _f:
-            _f.write(self.json(indent=4, ensure_ascii=False))
+        NConfig.__save_hooks.append(callback)
+        return callback
 
-    def reload(self) -> NoReturn:
+    def save(self, immediate: bool = False) -> NoReturn:
         """
-        Reload config from config.json.
+        Save config to config.json.
+
+        Saves within a short window are coalesced into one atomic write
+        in a worker thread, which is skipped if the content is unchanged.
 
+        :param immediate: Write in the calling thread without waiting.
         :return: NoReturn
         """
 
-        super().__init__(**self.__load())
+        for hook in NConfig.__save_hooks:
+            hook()
+        if NConfig.__writer is None:
+            NConfig.__writer = DebouncedWriter(
+                self.__path, self.__serialize, delay=1.0, on_written=self.__written
+            )
+        NConfig.__writer.schedule()
+        if immediate:
+            NConfig.__writer.flush()
+
+    def reload(self) -> dict[str, tuple[Any, Any]]:
+        """
+        Reload config from config.json, only changed sections are validated
+        and replaced.
+
+        :return: Changed sections, mapped to their old and new JSON values
+        """
+
+        data = self.__load()
+        current = json.loads(self.json())
+        changed = {}
+        for name, field in self.__fields__.items():
+            new = json.loads(
+                json.dumps(
+                    data.get(name, field.get_default()), default=pydantic_encoder
+                )
+            )
+            if new == current.get(name):
+                continue
+            value, errors = field.validate(new, {}, loc=name, cls=self.__class__)
+            if errors:
+                raise ValidationError(
+                    errors if isinstance(errors, list) else [errors], self.__class__
+                )
+            changed[name] = (current.get(name), value)
+        for name, (_, value) in changed.items():
+            setattr(self, name, value)
+        current = json.loads(self.json())
+        return {name: (old, current.get(name)) for name, (old, _) in changed.items()}
 
     def get_module_config(self, module: str, key: str = None):
         """
@@ -356,6 +514,8 @@ class Module(BaseModel):
     override_default: None | bool = None
     override_switch: None | bool = None
     help: dict[str, str] = {}
+    triggers: list[str] = []
+    sha256: None | str = None
 
     @validator("category", pre=True)
     def category_validator(cls, category):
@@ -0,0 +1,242 @@
+import atexit
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Hashable, NoReturn
+
+from loguru import logger
+
+
+def atomic_write(path: Path, data: str | bytes, encoding: str = "utf-8") -> NoReturn:
+    """
+    Write data to a file atomically, readers will see either the old
+    or the new content but never a partially written file.
+
+    :param path: Path of the file.
+    :param data: Content to write.
+    :param encoding: Encoding used when data is str.
+    :return: None.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode(encoding) if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+
+class DebouncedWriter:
+    """
+    Coalesces write requests for a file into a single atomic write,
+    performed in a worker thread after a short delay.
+
+    The serializer may return None to skip the write, e.g. when the
+    content is unchanged, the optional callback is only called once the
+    content actually reached the file.
+    """
+
+    path: Path
+    delay: float
+    max_delay: float
+
+    __serializer: Callable[[], str | bytes]
+    __on_written: Callable[[str | bytes], None] | None
+    __dirty: bool
+    __failures: int
+    __timer: threading.Timer | None
+    __state_lock: threading.Lock
+    __io_lock: threading.Lock
+
+    def __init__(
+        self,
+        path: Path,
+        serializer: Callable[[], str | bytes],
+        delay: float = 0.5,
+        max_delay: float = 60.0,
+        on_written: Callable[[str | bytes], None] = None,
+    ):
+        """
+        :param path: Path of the file.
+        :param serializer: Callable returning the content to write, or None.
+        :param delay: Seconds to wait for further changes before writing.
+        :param max_delay: Upper bound of the retry delay after failed writes.
+        :param on_written: Callable receiving the content after a successful write.
+        """
+
+        self.path = path
+        self.delay = delay
+        self.max_delay = max_delay
+        self.__serializer = serializer
+        self.__on_written = on_written
+        self.__dirty = False
+        self.__failures = 0
+        self.__timer = None
+        self.__state_lock = threading.Lock()
+        self.__io_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def dirty(self) -> bool:
+        return self.__dirty
+
+    def schedule(self) -> NoReturn:
+        """
+        Mark the content as changed and schedule a write.
+
+        :return: None.
+        """
+
+        with self.__state_lock:
+            self.__dirty = True
+            self.__arm(self.delay)
+
+    def __arm(self, delay: float) -> NoReturn:
+        if self.__timer is not None:
+            return
+        self.__timer = threading.Timer(delay, self.flush)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def flush(self) -> NoReturn:
+        """
+        Write pending changes immediately in the calling thread.
+
+        :return: None.
+        """
+
+        with self.__io_lock:
+            with self.__state_lock:
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    self.__timer = None
+                if not self.__dirty:
+                    return
+                self.__dirty = False
+            try:
+                if (data := self.__serializer()) is not None:
+                    atomic_write(self.path, data)
+                    if self.__on_written is not None:
+                        self.__on_written(data)
+            except Exception as e:
+                with self.__state_lock:
+                    self.__dirty = True
+                    self.__failures += 1
+                    delay = min(self.max_delay, self.delay * 2**self.__failures)
+                    self.__arm(delay)
+                logger.error(f"Failed to write {self.path}, retrying in {delay}s: {e}")
+                return
+            self.__failures = 0
+
+
+class DebouncedBatchWriter:
+    """
+    Coalesces write requests for a family of files, e.g. one shard per
+    group, sharing a single timer thread and a single exit hook.
+
+    Changed keys are collected in a set and drained in one pass, the
+    serializer receives a key and may return None to skip its write.
+    Keys whose write failed are retried together after a growing delay.
+    """
+
+    delay: float
+    max_delay: float
+
+    __path: Callable[[Hashable], Path]
+    __serializer: Callable[[Hashable], str | bytes | None]
+    __on_written: Callable[[Hashable, str | bytes], None] | None
+    __dirty: set[Hashable]
+    __failures: int
+    __timer: threading.Timer | None
+    __state_lock: threading.Lock
+    __io_lock: threading.Lock
+
+    def __init__(
+        self,
+        path: Callable[[Hashable], Path],
+        serializer: Callable[[Hashable], str | bytes | None],
+        delay: float = 0.5,
+        max_delay: float = 60.0,
+        on_written: Callable[[Hashable, str | bytes], None] = None,
+    ):
+        """
+        :param path: Callable returning the path of the file for a key.
+        :param serializer: Callable returning the content to write for a key, or None.
+        :param delay: Seconds to wait for further changes before writing.
+        :param max_delay: Upper bound of the retry delay after failed writes.
+        :param on_written: Callable receiving the key and content after a successful write.
+        """
+
+        self.delay = delay
+        self.max_delay = max_delay
+        self.__path = path
+        self.__serializer = serializer
+        self.__on_written = on_written
+        self.__dirty = set()
+        self.__failures = 0
+        self.__timer = None
+        self.__state_lock = threading.Lock()
+        self.__io_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.__dirty)
+
+    def schedule(self, key: Hashable) -> NoReturn:
+        """
+        Mark the content of a key as changed and schedule a write.
+
+        :param key: Key of the changed file.
+        :return: None.
+        """
+
+        with self.__state_lock:
+            self.__dirty.add(key)
+            self.__arm(self.delay)
+
+    def __arm(self, delay: float) -> NoReturn:
+        if self.__timer is not None:
+            return
+        self.__timer = threading.Timer(delay, self.flush)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def flush(self) -> NoReturn:
+        """
+        Write all pending changes immediately in the calling thread.
+
+        :return: None.
+        """
+
+        with self.__io_lock:
+            with self.__state_lock:
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    self.__timer = None
+                dirty, self.__dirty = self.__dirty, set()
+            failed = set()
+            for key in dirty:
+                try:
+                    if (data := self.__serializer(key)) is not None:
+                        atomic_write(self.__path(key), data)
+                        if self.__on_written is not None:
+                            self.__on_written(key, data)
+                except Exception as e:
+                    failed.add(key)
+                    logger.error(f"Failed to write {self.__path(key)}: {e}")
+            if not failed:
+                self.__failures = 0
+                return
+            with self.__state_lock:
+                self.__dirty |= failed
+                self.__failures += 1
+                delay = min(self.max_delay, self.delay * 2**self.__failures)
+                self.__arm(delay)
+            logger.error(f"Retrying {len(failed)} failed writes in {delay}s")
@@ -1,2 +1,3 @@
 from .blacklist import blacklist
 from .interval import interval
+from .watcher import watcher
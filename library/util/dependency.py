@@ -1,13 +1,184 @@
-import asyncio
+import importlib
+import importlib.metadata
+import re
 import subprocess
+import threading
 from pathlib import Path
 from typing import NoReturn
 
 from loguru import logger
 
 from library.config import config
+from library.executor import executors
 from library.model import Module
 
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:
+    Requirement = None
+
+__import_names: dict[str, list[str]] | None = None
+__installed: dict[str, str] | None = None
+__lock = threading.Lock()
+
+
+def read_requirements(module: Module) -> list[str]:
+    """
+    Read requirements of a module, blank lines and comments are skipped.
+
+    :param module: Module.
+    :return: List of requirements.
+    """
+
+    return read_requirements_file(
+        Path(Path().resolve(), *module.pack.split("."), "requirements.txt")
+    )
+
+
+def read_requirements_file(path: Path) -> list[str]:
+    """
+    Read a requirements file, blank lines and comments are skipped.
+
+    :param path: Path of the requirements file.
+    :return: List of requirements, empty if the file does not exist.
+    """
+
+    if not path.is_file():
+        return []
+    return [
+        line
+        for line in map(str.strip, path.read_text().splitlines())
+        if line and not line.startswith("#")
+    ]
+
+
+def requirement_name(requirement: str) -> str | None:
+    """
+    Get the normalized distribution name of a requirement line.
+
+    :param requirement: Requirement, e.g. Pillow>=9.0 or pillow @ https://...
+    :return: Normalized name, e.g. pillow, or None for options, paths and bare URLs.
+    """
+
+    requirement = requirement.strip()
+    if requirement.startswith(("-", ".", "/")):
+        return None
+    if "@" in requirement:
+        requirement, _ = requirement.split("@", 1)
+        if not (
+            match := re.fullmatch(
+                r"([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*", requirement
+            )
+        ):
+            return None
+    elif "://" in requirement or not (
+        match := re.match(r"([A-Za-z0-9][A-Za-z0-9._-]*)", requirement)
+    ):
+        return None
+    return re.sub(r"[-_.]+", "-", match.group(1)).lower()
+
+
+def import_names(requirement: str) -> list[str]:
+    """
+    Get the top-level import names provided by an installed requirement.
+
+    :param requirement: Requirement line.
+    :return: List of import names, empty if the requirement is not installed.
+    """
+
+    global __import_names
+    with __lock:
+        if __import_names is None:
+            __import_names = {}
+            for (
+                package,
+                distributions,
+            ) in importlib.metadata.packages_distributions().items():
+                for distribution in distributions:
+                    __import_names.setdefault(
+                        requirement_name(distribution) or distribution, []
+                    ).append(package)
+        return __import_names.get(requirement_name(requirement), [])
+
+
+def installed_version(requirement: str) -> str | None:
+    """
+    Get the installed version of a requirement.
+
+    :param requirement: Requirement line.
+    :return: Version, or None if the requirement is not installed.
+    """
+
+    global __installed
+    with __lock:
+        if __installed is None:
+            __installed = {
+                requirement_name(
+                    distribution.metadata["Name"] or ""
+                ): distribution.version
+                for distribution in importlib.metadata.distributions()
+            }
+        return __installed.get(requirement_name(requirement), None)
+
+
+def is_satisfied(requirement: str) -> bool:
+    """
+    Check if a requirement is satisfied by the installed distributions,
+    version specifiers and markers are honoured when packaging is available.
+
+    :param requirement: Requirement line.
+    :return: bool.
+    """
+
+    if requirement_name(requirement) is None:
+        return True
+    if Requirement is None:
+        return installed_version(requirement) is not None
+    try:
+        parsed = Requirement(requirement)
+    except InvalidRequirement:
+        return installed_version(requirement) is not None
+    if parsed.marker is not None and not parsed.marker.evaluate():
+        return True
+    if (version := installed_version(parsed.name)) is None:
+        return False
+    return parsed.specifier.contains(version, prereleases=True)
+
+
+def missing_requirements(modules: list[Module]) -> dict[str, list[str]]:
+    """
+    Collect requirements of modules that are not satisfied yet.
+
+    :param modules: List of modules.
+    :return: Dict of module pack to its missing requirements.
+    """
+
+    return {
+        module.pack: missing
+        for module in modules
+        if (
+            missing := [
+                requirement
+                for requirement in read_requirements(module)
+                if not is_satisfied(requirement)
+            ]
+        )
+    }
+
+
+def invalidate_installed() -> NoReturn:
+    """
+    Forget the installed distributions, called after installing requirements.
+
+    :return: None.
+    """
+
+    global __import_names, __installed
+    with __lock:
+        __import_names = None
+        __installed = None
+    importlib.invalidate_caches()
+
 
 def install_dependency(
     module: Module = None, requirements: list[str] = None
@@ -22,14 +193,14 @@ def install_dependency(
 
     if not module and not requirements:
         raise ValueError("module or requirements must be filled")
-    if module:
-        requirements_path = Path(
-            Path().resolve(), *module.pack.split("."), "requirements.txt"
-        )
-        if not requirements_path.is_file():
-            return
-        requirements = requirements_path.read_text().splitlines()
-    command = ["pip", "install"] if config.env == "pip" else ["poetry", "add"]
+    if module and not (requirements := read_requirements(module)):
+        return
+    if wheelhouse := config.loader.wheelhouse:
+        command = ["pip", "install", "--no-index", "--find-links", str(wheelhouse)]
+        if config.env != "pip":
+            command = ["poetry", "run", *command]
+    else:
+        command = ["pip", "install"] if config.env == "pip" else ["poetry", "add"]
     process = subprocess.Popen(
         [*command, *requirements],
         stdout=subprocess.PIPE,
@@ -40,6 +211,7 @@ def install_dependency(
         logger.info(info)
     if err := stderr.decode("utf-8"):
         logger.error(err)
+    invalidate_installed()
 
 
 async def async_install_dependency(
@@ -53,5 +225,4 @@ async def async_install_dependency(
     :return: None.
     """
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, install_dependency, module, requirements)
+    await executors.run("dependency", install_dependency, module, requirements)
@@ -1,4 +1,8 @@
+import atexit
 import pickle
+import sqlite3
+import threading
+import time
 from copy import deepcopy
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -159,10 +163,356 @@ class Interval:
             self.__save_pickle()
 
 
-interval = Interval()
+class SQLiteInterval:
+    """
+    Interval backed by a SQLite table, shared between processes.
+
+    Deadlines are kept in memory as a hot set, the table is the source of
+    truth whenever the hot set cannot prove a user is still in the interval.
+    Statements run on the event loop, so waiting on a lock held by another
+    process is bounded by a short busy timeout, after which the check falls
+    back to the hot set and the write is queued.
+    """
+
+    __instance: "SQLiteInterval" = None
+    __database_path: Path
+    __connection: sqlite3.Connection
+    __lock: threading.Lock
+    __cache: dict[str, dict[int, float]]
+    __pending: dict[tuple[str, int], float | None]
+    __last_flush: float
+
+    __CREATE_TABLE = (
+        "CREATE TABLE IF NOT EXISTS interval_deadline ("
+        "module TEXT NOT NULL, "
+        "supplicant INTEGER NOT NULL, "
+        "deadline REAL NOT NULL, "
+        "PRIMARY KEY (module, supplicant)"
+        ") WITHOUT ROWID"
+    )
+    __CHECK_AND_UPDATE = (
+        "INSERT INTO interval_deadline (module, supplicant, deadline) "
+        "VALUES (?, ?, ?) "
+        "ON CONFLICT (module, supplicant) DO UPDATE SET deadline = excluded.deadline "
+        "WHERE interval_deadline.deadline <= ? "
+        "RETURNING deadline"
+    )
+    __UPSERT = (
+        "INSERT OR REPLACE INTO interval_deadline (module, supplicant, deadline) "
+        "VALUES (?, ?, ?)"
+    )
+    __RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+    """ Whether SQLite supports RETURNING, older versions use a transaction """
+
+    def __init__(self):
+        self.__database_path = config.interval.database or Path(
+            config.path.data, "library", "interval.db"
+        )
+        self.__lock = threading.Lock()
+        self.__cache = {}
+        self.__pending = {}
+        self.__last_flush = time.monotonic()
+        self.__connection = sqlite3.connect(
+            self.__database_path,
+            timeout=config.interval.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(self.__CREATE_TABLE)
+        atexit.register(self.close)
+        logger.success(f"Using interval database at {self.__database_path}")
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    def __repr__(self):
+        return str(self.__cache)
+
+    def __str__(self):
+        return str(self.__cache)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Write queued updates and close the connection.
+
+        :return: None
+        """
+
+        try:
+            with self.__lock:
+                self.__flush_pending()
+            self.__connection.close()
+        except AttributeError:
+            pass
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write queued interval deadlines: {e}")
+
+    @staticmethod
+    def __type_convert(supplicant: int | Member | Friend | None) -> int | None:
+        if supplicant is None:
+            return supplicant
+        if isinstance(supplicant, (Member, Friend)):
+            return supplicant.id
+        return supplicant
+
+    def __remember(self, module: str, supplicant: int, deadline: float | None):
+        if deadline is None:
+            if module in self.__cache:
+                self.__cache[module].pop(supplicant, None)
+            return
+        self.__cache.setdefault(module, {})[supplicant] = deadline
+
+    def __flush_pending(self):
+        """
+        Write queued updates to the table in a single transaction.
+        Must be called with the lock held.
+        """
+
+        self.__last_flush = time.monotonic()
+        if not self.__pending:
+            return
+        self.__connection.execute("BEGIN IMMEDIATE")
+        pending, self.__pending = self.__pending, {}
+        upserts = [
+            (module, supplicant, deadline)
+            for (module, supplicant), deadline in pending.items()
+            if deadline is not None
+        ]
+        deletes = [
+            (module, supplicant)
+            for (module, supplicant), deadline in pending.items()
+            if deadline is None
+        ]
+        try:
+            if upserts:
+                self.__connection.executemany(self.__UPSERT, upserts)
+            if deletes:
+                self.__connection.executemany(
+                    "DELETE FROM interval_deadline WHERE module = ? AND supplicant = ?",
+                    deletes,
+                )
+            self.__connection.execute("COMMIT")
+        except sqlite3.Error:
+            self.__connection.execute("ROLLBACK")
+            self.__pending = {**pending, **self.__pending}
+            raise
+
+    def __maybe_flush(self):
+        if (
+            len(self.__pending) >= config.interval.batch_size
+            or time.monotonic() - self.__last_flush >= config.interval.flush_interval
+        ):
+            self.__flush_pending()
+
+    def __claim(
+        self, module: str, supplicant: int, deadline: float, now: float
+    ) -> bool:
+        """
+        Set the deadline of a user if the stored one has passed, in a single
+        statement or, without RETURNING support, a single write transaction.
+        Must be called with the lock held.
+
+        :return: Whether the deadline was set.
+        """
+
+        if self.__RETURNING:
+            return (
+                self.__connection.execute(
+                    self.__CHECK_AND_UPDATE, (module, supplicant, deadline, now)
+                ).fetchone()
+                is not None
+            )
+        self.__connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.__connection.execute(
+                "SELECT deadline FROM interval_deadline WHERE module = ? AND supplicant = ?",
+                (module, supplicant),
+            ).fetchone()
+            if claimed := row is None or row[0] <= now:
+                self.__connection.execute(self.__UPSERT, (module, supplicant, deadline))
+            self.__connection.execute("COMMIT")
+        except sqlite3.Error:
+            self.__connection.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def __fetch(self, module: str, supplicant: int) -> float | None:
+        if (module, supplicant) in self.__pending:
+            return self.__pending[(module, supplicant)]
+        row = self.__connection.execute(
+            "SELECT deadline FROM interval_deadline WHERE module = ? AND supplicant = ?",
+            (module, supplicant),
+        ).fetchone()
+        deadline = row[0] if row else None
+        self.__remember(module, supplicant, deadline)
+        return deadline
+
+    def update(
+        self,
+        module: str,
+        supplicant: int | Member | Friend,
+        _interval: timedelta | None,
+    ):
+        """
+        Update the interval of a user, the write is batched.
+
+        :param module: Module name.
+        :param supplicant: User ID or Member or Friend object.
+        :param _interval: Interval to update.
+        :return: None
+        """
+
+        supplicant = self.__type_convert(supplicant)
+        deadline = (
+            None if _interval is None else time.time() + _interval.total_seconds()
+        )
+        with self.__lock:
+            self.__remember(module, supplicant, deadline)
+            self.__pending[(module, supplicant)] = deadline
+            try:
+                self.__maybe_flush()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Interval database busy, write queued: {e}")
+
+    def get(self, module: str, supplicant: int | Member | Friend) -> datetime | None:
+        """
+        Get the interval of a user.
+
+        :param module: Module name.
+        :param supplicant: User ID or Member or Friend object.
+        :return: Interval or None
+        """
+
+        supplicant = self.__type_convert(supplicant)
+        deadline = self.__cache.get(module, {}).get(supplicant, None)
+        if deadline is None or deadline < time.time():
+            with self.__lock:
+                deadline = self.__fetch(module, supplicant)
+        return None if deadline is None else datetime.fromtimestamp(deadline)
+
+    def check(self, module: str, supplicant: int | Member | Friend) -> bool:
+        """
+        Check if a user is in the interval.
+
+        :param module: Module name.
+        :param supplicant: User ID or Member or Friend object.
+        :return: True if not in the interval, False otherwise.
+        """
+
+        if _interval := self.get(module, supplicant):
+            return _interval < datetime.now()
+        return True
+
+    def check_and_update(
+        self, module: str, supplicant: int | Member | Friend, _interval: timedelta
+    ) -> bool | datetime:
+        """
+        Check if a user is in the interval and update it atomically.
+
+        :param module: Module name.
+        :param supplicant: User ID or Member or Friend object.
+        :param _interval: Interval to update.
+        :return: True if not in the interval, datetime of the interval otherwise.
+        """
+
+        supplicant = self.__type_convert(supplicant)
+        now = time.time()
+        deadline = self.__cache.get(module, {}).get(supplicant, None)
+        if deadline is not None and deadline > now:
+            return datetime.fromtimestamp(deadline)
+        deadline = now + _interval.total_seconds()
+        with self.__lock:
+            try:
+                if (module, supplicant) in self.__pending:
+                    self.__flush_pending()
+                claimed = self.__claim(module, supplicant, deadline, now)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Interval database busy, checked in memory: {e}")
+                self.__pending[(module, supplicant)] = deadline
+                claimed = True
+            if claimed:
+                self.__remember(module, supplicant, deadline)
+                return True
+            if (current := self.__fetch(module, supplicant)) is None:
+                return True
+        return datetime.fromtimestamp(current)
+
+    def flush_pending(self):
+        """
+        Write queued updates if the flush interval has passed since the last write.
+
+        :return: None
+        """
+
+        with self.__lock:
+            if time.monotonic() - self.__last_flush >= config.interval.flush_interval:
+                try:
+                    self.__flush_pending()
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"Interval database busy, write queued: {e}")
+
+    def flush(
+        self,
+        module: str | None = None,
+        supplicant: int | Member | Friend | None = None,
+        *,
+        skip_saving: bool = False,
+    ):
+        supplicant = self.__type_convert(supplicant)
+        with self.__lock:
+            self.__flush_pending()
+            if not module:
+                self.__cache = {}
+                self.__connection.execute("DELETE FROM interval_deadline")
+            elif not supplicant:
+                self.__cache.pop(module, None)
+                self.__connection.execute(
+                    "DELETE FROM interval_deadline WHERE module = ?", (module,)
+                )
+            else:
+                self.__remember(module, supplicant, None)
+                self.__connection.execute(
+                    "DELETE FROM interval_deadline WHERE module = ? AND supplicant = ?",
+                    (module, supplicant),
+                )
+
+    def cleanup(self):
+        now = time.time()
+        with self.__lock:
+            self.__flush_pending()
+            for module, users in self.__cache.items():
+                self.__cache[module] = {
+                    user: deadline
+                    for user, deadline in users.items()
+                    if deadline >= now
+                }
+            self.__connection.execute(
+                "DELETE FROM interval_deadline WHERE deadline < ?", (now,)
+            )
+
+
+interval: Interval | SQLiteInterval = (
+    SQLiteInterval() if config.interval.backend == "sqlite" else Interval()
+)
 scheduler: GraiaScheduler = scheduler.get()
 
 
 @scheduler.schedule(timers.crontabify("* * * * *"))
 async def __auto_cleanup():
     interval.cleanup()
+
+
+if isinstance(interval, SQLiteInterval):
+
+    @scheduler.schedule(
+        timers.every_custom_seconds(max(1, round(config.interval.flush_interval)))
+    )
+    async def __auto_flush():
+        interval.flush_pending()
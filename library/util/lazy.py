@@ -0,0 +1,169 @@
+from typing import Callable, NoReturn
+
+from graia.ariadne.event.message import FriendMessage, GroupMessage, MessageEvent
+from graia.broadcast import Broadcast
+from graia.broadcast.entities.listener import Listener
+from graia.saya import Saya
+from graia.saya.builtins.broadcast import ListenerSchema
+from loguru import logger
+
+from library.config.snapshot import snapshot
+from library.executor import executors
+from library.model import Module
+from library.orm import db_init
+
+
+class LazyActivator:
+    """
+    Defers importing modules until a message matching one of their
+    declared triggers arrives in a chat where the module is switched on,
+    the message is then replayed to the listeners of the freshly loaded
+    module. Deferred dependencies are loaded first, each in its own context.
+    """
+
+    __instance: "LazyActivator" = None
+    __pending: dict[str, tuple[Module, Listener, Callable[[Module], None], list[str]]]
+    __broadcast: Broadcast | None
+
+    def __init__(self):
+        self.__pending = {}
+        self.__broadcast = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @staticmethod
+    def matches(module: Module, event: MessageEvent) -> bool:
+        """
+        Check if a message starts with one of the module's triggers,
+        with or without a command prefix.
+
+        :param module: Module object.
+        :param event: Message event.
+        :return: bool.
+        """
+
+        text = str(event.message_chain).lstrip()
+        stripped = snapshot().strip_prefix(text)
+        return any(
+            text.startswith(trigger)
+            or (stripped is not None and stripped.startswith(trigger))
+            for trigger in module.triggers
+        )
+
+    def pending(self, pack: str) -> bool:
+        """
+        Check if a module is deferred and not yet loaded.
+
+        :param pack: Module pack.
+        :return: bool.
+        """
+
+        return pack in self.__pending
+
+    def defer(
+        self,
+        module: Module,
+        saya: Saya,
+        require: Callable[[Module], None],
+        dependencies: list[str] = None,
+    ) -> NoReturn:
+        """
+        Register a stub listener that loads the module on its first matching message.
+
+        :param module: Module object, must declare triggers.
+        :param saya: Saya instance.
+        :param require: Callable loading the module within a module context.
+        :param dependencies: Packs of the installed dependencies of the module.
+        :return: None.
+        """
+
+        self.__broadcast = saya.broadcast
+
+        async def __activate(event: MessageEvent):
+            from library.depend.switch import Switch
+
+            if self.matches(module, event) and Switch.manually_check(
+                module.pack, event
+            ):
+                await self.activate(module, saya, event)
+
+        listener = Listener(
+            callable=__activate,
+            namespace=saya.broadcast.getDefaultNamespace(),
+            listening_events=[GroupMessage, FriendMessage],
+        )
+        saya.broadcast.listeners.append(listener)
+        self.__pending[module.pack] = (module, listener, require, dependencies or [])
+        logger.info(f"Deferred {module.pack} until {', '.join(module.triggers)}")
+
+    def discard(self, pack: str) -> bool:
+        """
+        Remove the stub listener of a deferred module.
+
+        :param pack: Module pack.
+        :return: Whether the module was deferred.
+        """
+
+        if (pending := self.__pending.pop(pack, None)) is None:
+            return False
+        _, listener, _, _ = pending
+        if listener in self.__broadcast.listeners:
+            self.__broadcast.removeListener(listener)
+        return True
+
+    async def __load(self, pack: str) -> bool:
+        """
+        Load a deferred module after its deferred dependencies, in the module
+        executor since requiring may install requirements.
+
+        :param pack: Module pack.
+        :return: Whether the module was deferred.
+        """
+
+        if (pending := self.__pending.get(pack, None)) is None:
+            return False
+        module, _, require, dependencies = pending
+        self.discard(pack)
+        for dependency in dependencies:
+            await self.__load(dependency)
+        logger.info(f"Activating {pack}")
+        await executors.run("module", require, module)
+        return True
+
+    async def activate(
+        self, module: Module, saya: Saya, event: MessageEvent
+    ) -> NoReturn:
+        """
+        Load a deferred module and replay the event to its listeners.
+
+        :param module: Module object.
+        :param saya: Saya instance.
+        :param event: Event that triggered the activation.
+        :return: None.
+        """
+
+        if await self.__load(module.pack):
+            await db_init()
+        if (channel := saya.channels.get(module.pack, None)) is None:
+            return
+        broadcast = saya.broadcast
+        targets = [
+            listener
+            for cube in channel.content
+            if isinstance(cube.metaclass, ListenerSchema)
+            and (listener := broadcast.getListener(cube.content)) is not None
+        ]
+        await broadcast.layered_scheduler(
+            listener_generator=(
+                listener
+                for listener in broadcast.default_listener_generator(event.__class__)
+                if listener in targets
+            ),
+            event=event,
+        )
+
+
+lazy = LazyActivator()
@@ -0,0 +1,246 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from pathlib import Path
+from typing import NoReturn
+
+from loguru import logger
+
+from library.config import config
+from library.storage import atomic_write
+
+PROFILE_ENV = "PROJECT_NULL_PROFILE"
+
+
+class _ImportTimer(MetaPathFinder):
+    """
+    Meta path finder that times module execution of third-party packages
+    and attributes the cumulative time to their top-level package.
+
+    Loaders are patched once, even when shared between modules, and get
+    their own exec_module back when the timer is removed.
+    """
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.__profiler = profiler
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__patched: dict[int, tuple[object, object | None]] = {}
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self.__local, "finding", False):
+            return None
+        self.__local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                if (spec := finder.find_spec(fullname, path, target)) is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.__local.finding = False
+        loader = spec.loader
+        if (
+            loader is None
+            or isinstance(loader, type)
+            or not hasattr(loader, "exec_module")
+            or not self.__profiler.is_third_party(fullname.split(".", maxsplit=1)[0])
+        ):
+            return spec
+        with self.__lock:
+            if id(loader) not in self.__patched:
+                self.__patch(loader)
+        return spec
+
+    def __patch(self, loader):
+        exec_module = loader.exec_module
+
+        def __timed_exec_module(module):
+            top = module.__name__.split(".", maxsplit=1)[0]
+            stack: list[str] = self.__local.__dict__.setdefault("stack", [])
+            outermost = top not in stack
+            stack.append(top)
+            start = time.perf_counter()
+            try:
+                return exec_module(module)
+            finally:
+                stack.pop()
+                if outermost:
+                    self.__profiler.record_package(top, time.perf_counter() - start)
+
+        own = getattr(loader, "__dict__", {}).get("exec_module", None)
+        try:
+            loader.exec_module = __timed_exec_module
+        except AttributeError:
+            return
+        self.__patched[id(loader)] = (loader, own)
+
+    def restore(self) -> NoReturn:
+        """
+        Give every patched loader its own exec_module back.
+
+        :return: None.
+        """
+
+        with self.__lock:
+            for loader, own in self.__patched.values():
+                if own is not None:
+                    loader.exec_module = own
+                else:
+                    del loader.exec_module
+            self.__patched.clear()
+
+
+class StartupProfiler:
+    """
+    Records per-module startup timings and writes a report once loading is done.
+    """
+
+    __instance: "StartupProfiler" = None
+    __modules: dict[str, dict[str, float]]
+    __packages: dict[str, float]
+    __finder: _ImportTimer | None
+    __local_packages: set[str] = {"module", "library", "main"}
+    __started: float
+    __path: Path = Path(config.path.data, "library", "startup_profile")
+
+    def __init__(self):
+        self.__modules = {}
+        self.__packages = {}
+        self.__finder = None
+        self.__started = time.perf_counter()
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether profiling is enabled by config or environment variable.
+
+        :return: bool.
+        """
+
+        return config.loader.profile or os.environ.get(PROFILE_ENV, "") not in {
+            "",
+            "0",
+        }
+
+    def is_third_party(self, package: str) -> bool:
+        """
+        Check if a top-level package is neither stdlib nor part of the bot.
+
+        :param package: Top-level package name.
+        :return: bool.
+        """
+
+        return (
+            package not in sys.stdlib_module_names
+            and package not in sys.builtin_module_names
+            and package not in self.__local_packages
+        )
+
+    def start(self) -> NoReturn:
+        """
+        Start attributing import time to third-party packages.
+
+        :return: None.
+        """
+
+        if not self.enabled or self.__finder is not None:
+            return
+        self.__started = time.perf_counter()
+        self.__finder = _ImportTimer(self)
+        sys.meta_path.insert(0, self.__finder)
+
+    def stop(self) -> NoReturn:
+        """
+        Stop attributing import time.
+
+        :return: None.
+        """
+
+        if self.__finder is None:
+            return
+        if self.__finder in sys.meta_path:
+            sys.meta_path.remove(self.__finder)
+        self.__finder.restore()
+        self.__finder = None
+
+    def record_package(self, package: str, elapsed: float) -> NoReturn:
+        """
+        Add import time to a top-level package.
+
+        :param package: Top-level package name.
+        :param elapsed: Seconds spent.
+        :return: None.
+        """
+
+        self.__packages[package] = self.__packages.get(package, 0.0) + elapsed
+
+    @contextmanager
+    def measure(self, pack: str, phase: str):
+        """
+        Measure a phase of loading a module, times of the same phase add up.
+
+        :param pack: Module pack.
+        :param phase: Phase name, e.g. wall, import, install.
+        """
+
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.__modules.setdefault(pack, {})
+            record[phase] = record.get(phase, 0.0) + time.perf_counter() - start
+
+    def report(self, top: int = 20) -> dict | None:
+        """
+        Stop profiling and write the report as text and JSON.
+
+        :param top: Number of slowest modules and packages to include in the text report.
+        :return: The report, or None if profiling is disabled.
+        """
+
+        if not self.enabled:
+            return None
+        self.stop()
+        modules = sorted(
+            self.__modules.items(), key=lambda x: x[1].get("wall", 0.0), reverse=True
+        )
+        packages = sorted(self.__packages.items(), key=lambda x: x[1], reverse=True)
+        report = {
+            "total": time.perf_counter() - self.__started,
+            "modules": dict(modules),
+            "packages": dict(packages),
+        }
+        lines = [f"Startup took {report['total']:.3f}s", "", "Slowest modules:"]
+        lines.extend(
+            f"  {pack:<40} wall {record.get('wall', 0.0):8.3f}s"
+            f"  import {record.get('import', 0.0):8.3f}s"
+            f"  install {record.get('install', 0.0):8.3f}s"
+            for pack, record in modules[:top]
+        )
+        lines.extend(["", "Slowest third-party imports:"])
+        lines.extend(
+            f"  {package:<40} {elapsed:8.3f}s" for package, elapsed in packages[:top]
+        )
+        atomic_write(self.__path.with_suffix(".txt"), "\n".join(lines) + "\n")
+        atomic_write(self.__path.with_suffix(".json"), json.dumps(report, indent=4))
+        logger.info("\n".join(lines[:1] + lines[2 : 3 + min(top, 5)]))
+        logger.success(f"Startup profile written to {self.__path.with_suffix('.txt')}")
+        return report
+
+
+profiler = StartupProfiler()
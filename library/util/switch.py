@@ -1,18 +1,204 @@
 import json
+import threading
 from pathlib import Path
-from typing import NoReturn
+from typing import NoReturn, Iterable
 
+import numpy as np
 from graia.ariadne.model import Group
 
 from library import config
+from library.config.event import (
+    ConfigChanged,
+    SwitchChanged,
+    config_events,
+)
+from library.config.snapshot import snapshot
 from library.model import Module
+from library.storage import DebouncedWriter, atomic_write
+from library.util.watcher import watcher
 from module import modules
 
 
+class SwitchMatrix:
+    """
+    Resolved switch values stored as a dense bit matrix, one row per group
+    and one bit per module, for vectorised per-group and cross-group queries.
+    """
+
+    packs: list[str]
+    groups: list[int]
+
+    __pack_index: dict[str, int]
+    __group_index: dict[int, int]
+    __bits: np.ndarray
+    __fallback: np.ndarray
+
+    def __init__(self, packs: list[str], fallback: list[bool]):
+        """
+        :param packs: Module packs, in row bit order.
+        :param fallback: Resolved value of each module for groups without a row.
+        """
+
+        self.packs = packs
+        self.groups = []
+        self.__pack_index = {pack: index for index, pack in enumerate(packs)}
+        self.__group_index = {}
+        self.__fallback = np.packbits(np.array(fallback, dtype=bool), bitorder="little")
+        self.__bits = np.empty((16, self.__fallback.size), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __row(self, group: int) -> np.ndarray:
+        if (index := self.__group_index.get(group, None)) is None:
+            return self.__fallback
+        return self.__bits[index]
+
+    def __add_group(self, group: int) -> int:
+        if (index := self.__group_index.get(group, None)) is not None:
+            return index
+        index = len(self.groups)
+        if index == self.__bits.shape[0]:
+            self.__bits = np.concatenate([self.__bits, np.empty_like(self.__bits)])
+        self.__bits[index] = self.__fallback
+        self.groups.append(group)
+        self.__group_index[group] = index
+        return index
+
+    def set(self, pack: str, group: int, value: bool):
+        """
+        Set the resolved value of a module in a group.
+
+        :param pack: Module pack.
+        :param group: Group id.
+        :param value: Resolved switch value.
+        :return: None.
+        """
+
+        if (module_index := self.__pack_index.get(pack, None)) is None:
+            return
+        index = self.__add_group(group)
+        row = self.__bits[index]
+        byte, mask = module_index // 8, 1 << (module_index % 8)
+        if value:
+            row[byte] |= mask
+        else:
+            row[byte] &= ~mask & 0xFF
+
+    def column(self, group: int) -> np.ndarray:
+        """
+        Get resolved values of all modules in a group.
+
+        :param group: Group id.
+        :return: Boolean array aligned with packs.
+        """
+
+        return np.unpackbits(
+            self.__row(group), count=len(self.packs), bitorder="little"
+        ).astype(bool)
+
+    def enabled_modules(self, group: int) -> list[str]:
+        """
+        Get modules enabled in a group.
+
+        :param group: Group id.
+        :return: List of module packs.
+        """
+
+        return [self.packs[index] for index in np.flatnonzero(self.column(group))]
+
+    def count_enabled(self, group: int) -> int:
+        """
+        Count modules enabled in a group.
+
+        :param group: Group id.
+        :return: Number of enabled modules.
+        """
+
+        return int(np.count_nonzero(self.column(group)))
+
+    def __select(self, groups: Iterable[int] | None) -> tuple[np.ndarray, int]:
+        if groups is None:
+            return self.__bits[: len(self.groups)], 0
+        groups = set(groups)
+        indices = [
+            index for group, index in self.__group_index.items() if group in groups
+        ]
+        return self.__bits[indices], len(groups) - len(indices)
+
+    def count_groups(self, pack: str, groups: Iterable[int] | None = None) -> int:
+        """
+        Count groups in which a module is enabled.
+
+        :param pack: Module pack.
+        :param groups: Groups to count, groups without stored values count by
+            the fallback value, None for groups with stored values only.
+        :return: Number of groups.
+        """
+
+        if (module_index := self.__pack_index.get(pack, None)) is None:
+            return 0
+        byte, mask = module_index // 8, 1 << (module_index % 8)
+        rows, missing = self.__select(groups)
+        return int(np.count_nonzero(rows[:, byte] & mask)) + (
+            missing if self.__fallback[byte] & mask else 0
+        )
+
+    def module_counts(self, groups: Iterable[int] | None = None) -> dict[str, int]:
+        """
+        Count groups in which each module is enabled.
+
+        :param groups: Groups to count, groups without stored values count by
+            the fallback values, None for groups with stored values only.
+        :return: Dict of module pack and number of groups.
+        """
+
+        rows, missing = self.__select(groups)
+        counts = np.unpackbits(
+            rows,
+            axis=1,
+            count=len(self.packs),
+            bitorder="little",
+        ).sum(axis=0, dtype=np.int64)
+        if missing:
+            counts += missing * np.unpackbits(
+                self.__fallback, count=len(self.packs), bitorder="little"
+            ).astype(np.int64)
+        return dict(zip(self.packs, counts.tolist()))
+
+    def group_counts(self) -> dict[int, int]:
+        """
+        Count enabled modules in each known group.
+
+        :return: Dict of group id and number of enabled modules.
+        """
+
+        counts = np.unpackbits(
+            self.__bits[: len(self.groups)],
+            axis=1,
+            count=len(self.packs),
+            bitorder="little",
+        ).sum(axis=1, dtype=np.int64)
+        return dict(zip(self.groups, counts.tolist()))
+
+
 class Switch:
     __switch: dict[str, dict[str, bool]] = {}
+    __path: Path = Path(config.path.data, "library", "switch.json")
+    __lock: threading.RLock
+    __writer: DebouncedWriter
+    __table: dict[tuple[str, int], bool]
+    __aliases: dict[str, set[str]]
+    __generation: int
+    __matrix: SwitchMatrix | None
 
     def __init__(self):
+        self.__lock = threading.RLock()
+        self.__table = {}
+        self.__aliases = {}
+        self.__generation = modules.generation
+        self.__matrix = None
+        self.__writer = DebouncedWriter(self.__path, self.__serialize)
         self.load()
 
     def load(self) -> NoReturn:
@@ -22,24 +208,56 @@ class Switch:
         :return: None.
         """
 
-        if not Path(config.path.data, "library", "switch.json").is_file():
+        if not self.__path.is_file():
             self.write()
-        with Path(config.path.data, "library", "switch.json").open(
-            "r", encoding="utf-8"
-        ) as f:
+        with self.__path.open("r", encoding="utf-8") as f:
             self.__switch = json.loads(f.read())
+        self.invalidate()
+
+    def reload(self) -> dict[str, set[str]]:
+        """
+        Reload switch data from storage, only changed values are invalidated.
+        Skipped while local changes are waiting to be written.
+
+        :return: Changed groups of each pack.
+        """
+
+        if self.__writer.dirty or not self.__path.is_file():
+            return {}
+        with self.__path.open("r", encoding="utf-8") as f:
+            data: dict[str, dict[str, bool]] = json.loads(f.read())
+        changed: dict[str, set[str]] = {}
+        with self.__lock:
+            for pack in data.keys() | self.__switch.keys():
+                old, new = self.__switch.get(pack, {}), data.get(pack, {})
+                if groups := {
+                    group
+                    for group in old.keys() | new.keys()
+                    if old.get(group, None) != new.get(group, None)
+                }:
+                    changed[pack] = groups
+            self.__switch = data
+        for pack, groups in changed.items():
+            for group in groups:
+                if group.lstrip("-").isdigit():
+                    self.invalidate(pack, int(group))
+            config_events.publish(SwitchChanged(pack=pack, groups=sorted(groups)))
+        return changed
+
+    def __serialize(self) -> str:
+        with self.__lock:
+            return json.dumps(self.__switch, indent=4, ensure_ascii=False)
 
     def write(self) -> NoReturn:
         """
-        Write switch data to storage.
+        Write switch data to storage immediately.
 
         :return: None.
         """
 
-        with Path(config.path.data, "library", "switch.json").open(
-            "w", encoding="utf-8"
-        ) as f:
-            f.write(json.dumps(self.__switch, indent=4, ensure_ascii=False))
+        if self.__writer.dirty:
+            return self.__writer.flush()
+        atomic_write(self.__path, self.__serialize())
 
     def get(self, pack: str | Module, group: Group | int | str | None) -> None | bool:
         """
@@ -68,6 +286,102 @@ class Switch:
             return module.get(group, None)
         return None
 
+    @staticmethod
+    def __group_id(group: Group | int | str | None) -> int:
+        if isinstance(group, Group):
+            return group.id
+        return 0 if group is None else int(group)
+
+    def resolve(self, pack: str | Module, group: Group | int | str | None) -> bool:
+        """
+        Resolve the effective switch value, folding in override_switch,
+        the stored value and the default value, answered from a decision table.
+
+        :param pack: pack name
+        :param group: group instance, group id or None
+        :return: effective switch value
+        """
+
+        if self.__generation != modules.generation:
+            self.invalidate()
+        key = (pack if isinstance(pack, str) else pack.pack, self.__group_id(group))
+        try:
+            return self.__table[key]
+        except KeyError:
+            pass
+        if (value := self.get(pack, key[1])) is None:
+            value = snapshot().default
+        module = pack if isinstance(pack, Module) else modules.get(pack)
+        self.__aliases.setdefault(module.pack if module else key[0], set()).add(key[0])
+        self.__table[key] = value
+        return value
+
+    def invalidate(self, pack: str | None = None, group: int | None = None):
+        """
+        Drop resolved values from the decision table, they are recomputed
+        on the next lookup.
+
+        :param pack: pack name, None for all packs
+        :param group: group id, None for all groups
+        :return: None.
+        """
+
+        with self.__lock:
+            if pack is None:
+                self.__table = {}
+                self.__aliases = {}
+                self.__generation = modules.generation
+                self.__matrix = None
+                return
+            aliases = self.__aliases.get(pack, {pack})
+            if group is not None:
+                for alias in aliases:
+                    self.__table.pop((alias, group), None)
+                value = self.resolve(pack, group)
+                if self.__matrix is not None:
+                    self.__matrix.set(pack, group, value)
+                return
+            self.__matrix = None
+            self.__table = {
+                key: value
+                for key, value in self.__table.items()
+                if key[0] not in aliases
+            }
+
+    @property
+    def matrix(self) -> SwitchMatrix:
+        """
+        Resolved switch values of all modules in all groups with stored values,
+        built lazily and kept up to date by update. May be called from worker
+        threads, the matrix is built under the lock so no update is lost.
+
+        :return: SwitchMatrix.
+        """
+
+        with self.__lock:
+            if self.__generation != modules.generation:
+                self.invalidate()
+            if self.__matrix is not None:
+                return self.__matrix
+            packs = [module.pack for module in modules]
+            matrix = SwitchMatrix(
+                packs,
+                [
+                    module.override_switch
+                    if isinstance(module.override_switch, bool)
+                    else snapshot().default
+                    for module in modules
+                ],
+            )
+            for module in modules:
+                if isinstance(module.override_switch, bool):
+                    continue
+                for group, value in self.__switch.get(module.pack, {}).items():
+                    if group.lstrip("-").isdigit() and isinstance(value, bool):
+                        matrix.set(module.pack, int(group), value)
+            self.__matrix = matrix
+            return matrix
+
     def update(self, pack: str, group: Group | int | str, value: bool):
         """
         Update switch value.
@@ -78,17 +392,37 @@ class Switch:
         :return: None.
         """
 
-        if isinstance(group, Group):
-            group = str(group.id)
-        elif isinstance(group, int):
-            group = str(group)
-        if pack in self.__switch.keys():
-            self.__switch[pack][group] = value
-            self.write()
-            return
-        self.__switch[pack] = {group: value}
-        self.write()
-        return
+        self.update_many([(pack, group, value)])
+
+    def update_many(
+        self, updates: Iterable[tuple[str, Group | int | str, bool]]
+    ) -> NoReturn:
+        """
+        Update multiple switch values, changes are written to storage
+        by a debounced background writer in a single write.
+
+        :param updates: Iterable of (pack name, group, switch value)
+        :return: None.
+        """
+
+        with self.__lock:
+            for pack, group, value in updates:
+                if isinstance(group, Group):
+                    group = str(group.id)
+                elif isinstance(group, int):
+                    group = str(group)
+                self.__switch.setdefault(pack, {})[group] = value
+                self.invalidate(pack, int(group))
+        self.__writer.schedule()
 
 
 switch = Switch()
+watcher.watch(Path(config.path.data, "library", "switch.json"), switch.reload)
+
+
+@config_events.subscribe(ConfigChanged)
+def __invalidate_on_default_change(event: ConfigChanged):
+    if event.section != "func":
+        return
+    if (event.old or {}).get("default") != (event.new or {}).get("default"):
+        switch.invalidate()
@@ -0,0 +1,119 @@
+from pathlib import Path
+from typing import Any, Callable, NoReturn
+
+from graia.scheduler import GraiaScheduler, timers
+from loguru import logger
+
+from library.config import config, group_config
+from library.config.event import ConfigChanged, GroupConfigChanged, config_events
+from library.context import scheduler
+
+
+class FileWatcher:
+    """
+    Polls watched files by mtime and size and calls back when they change.
+    """
+
+    __instance: "FileWatcher" = None
+    __files: dict[Path, tuple[tuple[int, int] | None, Callable[[], Any]]]
+    __pollers: list[Callable[[], Any]]
+
+    def __init__(self):
+        self.__files = {}
+        self.__pollers = []
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @staticmethod
+    def __signature(path: Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, path: Path, callback: Callable[[], Any]) -> NoReturn:
+        """
+        Watch a file.
+
+        :param path: Path of the file.
+        :param callback: Callable invoked after the file changed.
+        :return: None.
+        """
+
+        self.__files[path] = (self.__signature(path), callback)
+
+    def poll(self, callback: Callable[[], Any]) -> NoReturn:
+        """
+        Register a callable invoked on every check, for stores that
+        track their own files.
+
+        :param callback: Callable.
+        :return: None.
+        """
+
+        self.__pollers.append(callback)
+
+    def check(self) -> NoReturn:
+        """
+        Check watched files once.
+
+        :return: None.
+        """
+
+        for path, (signature, callback) in list(self.__files.items()):
+            if (current := self.__signature(path)) == signature:
+                continue
+            self.__files[path] = (current, callback)
+            logger.info(f"[Watcher] {path.name} changed")
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[Watcher] Failed to reload {path.name}: {e}")
+        for callback in self.__pollers:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[Watcher] {e}")
+
+
+def reload_config() -> list[str]:
+    """
+    Reload config.json and publish an event for every changed section.
+
+    :return: Names of changed sections.
+    """
+
+    if config.dirty:
+        return []
+    changed = config.reload()
+    for section, (old, new) in changed.items():
+        config_events.publish(ConfigChanged(section=section, old=old, new=new))
+    return list(changed.keys())
+
+
+def reload_group_config() -> list[int]:
+    """
+    Evict group configs changed on disk and publish an event for each.
+
+    :return: Ids of changed groups.
+    """
+
+    changed = group_config.reload_changed()
+    for group in changed:
+        config_events.publish(GroupConfigChanged(group=group))
+    return changed
+
+
+watcher = FileWatcher()
+watcher.watch(Path(Path().resolve(), "config.json"), reload_config)
+watcher.poll(reload_group_config)
+scheduler: GraiaScheduler = scheduler.get()
+
+
+@scheduler.schedule(timers.every_custom_seconds(5))
+async def __auto_check():
+    watcher.check()
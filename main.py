@@ -10,6 +10,7 @@ from graia.scheduler import GraiaScheduler
 from graia.scheduler.saya.behaviour import GraiaSchedulerBehaviour
 from graiax.playwright import PlaywrightService
 
+from library.accounting import AccountingBehaviour
 from library.config import config
 from library.context import scheduler
 
@@ -24,6 +25,7 @@ ariadne = Ariadne(
 saya = ariadne.create(Saya)
 scheduler.set(ariadne.create(GraiaScheduler))
 saya.install_behaviours(
+    AccountingBehaviour(),
     ariadne.create(BroadcastBehaviour),
     ariadne.create(GraiaSchedulerBehaviour),
 )
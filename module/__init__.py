@@ -1,8 +1,10 @@
-import asyncio
+import compileall
+import importlib
 import json
 import os
 import shutil
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import NoReturn
 
@@ -11,8 +13,17 @@ from loguru import logger
 from pydantic import ValidationError
 
 from library import config
+from library.executor import executors
 from library.model import Module
-from library.util.dependency import install_dependency
+from library.storage import atomic_write
+from library.util.dependency import (
+    import_names,
+    install_dependency,
+    missing_requirements,
+    read_requirements,
+)
+from library.util.lazy import lazy
+from library.util.profiler import profiler
 
 
 category_locale: dict[str, str] = {
@@ -31,6 +42,11 @@ class Modules:
 
     __all__: list[Module] = []
     __instance: "Modules" = None
+    __generation: int = 0
+    __index: dict[str, dict[str, list[Module]]] = {}
+    __position: dict[str, int] = {}
+    __levels: list[list[Module]] = []
+    __registry: Path = Path(config.path.data, "library", "module_registry.json")
 
     def __new__(cls, *args, **kwargs):
         if not cls.__instance:
@@ -38,7 +54,10 @@ class Modules:
         return cls.__instance
 
     def __init__(self):
+        if self.__restore():
+            return
         self.load(reorder=True)
+        self.__dump()
 
     def __getitem__(self, item: str | slice):
         return self.get(item) if isinstance(item, str) else self.__all__[item]
@@ -57,6 +76,16 @@ class Modules:
     def __repr__(self):
         return f"Modules({len(self)})\n{''.join(map(repr, self))}"
 
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped whenever the module list changes, used to invalidate caches.
+
+        :return: Generation number.
+        """
+
+        return self.__generation
+
     def __call__(self, match_any: bool = True, *args, **kwargs):
         if len(args) == 1:
             return self.search(match_any=True, name=args[0], pack=args[0])
@@ -73,11 +102,169 @@ class Modules:
         :return: None
         """
 
+        profiler.start()
+        __levels = [
+            [module for module in level if module.loaded] for level in self.__levels
+        ]
+        __missing = missing_requirements([m for level in __levels for m in level])
+        __deferred = self.__deferred([m for level in __levels for m in level])
+        __levels = self.__postpone(__levels, __missing)
+        with ThreadPoolExecutor(
+            max_workers=max(config.loader.prefetch_workers, 1),
+            thread_name_prefix="prefetch",
+        ) as pool, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="install"
+        ) as installer, saya.module_context():
+            __install = self.__install_missing(installer, __missing)
+            __futures = self.__prefetch_level(
+                pool, __levels[0] if __levels else [], __deferred
+            )
+            for index, level in enumerate(__levels):
+                wait(__futures)
+                __futures = self.__prefetch_level(
+                    pool,
+                    __levels[index + 1] if index + 1 < len(__levels) else [],
+                    __deferred,
+                )
+                for module in level:
+                    if module.pack in __deferred:
+                        lazy.defer(
+                            module,
+                            saya,
+                            lambda _module: self.__require_in_context(
+                                _module, saya, log_exception
+                            ),
+                            [m.pack for m in self.dependencies(module)],
+                        )
+                        continue
+                    if __install is not None and module.pack in __missing:
+                        with profiler.measure(module.pack, "install"):
+                            wait([__install])
+                    with profiler.measure(module.pack, "wall"):
+                        self.require_module(module, saya, log_exception)
+        profiler.report()
+
+    def __postpone(
+        self, levels: list[list[Module]], missing: dict[str, list[str]]
+    ) -> list[list[Module]]:
+        """
+        Move modules with missing requirements and their dependants after
+        all other levels, so modules that need nothing are loaded while the
+        requirements are being installed.
+
+        :param levels: Modules in topological levels.
+        :param missing: Dict of module pack to its missing requirements.
+        :return: Reordered levels, still in dependency order.
+        """
+
+        postponed = set(missing)
+        for level in levels:
+            postponed.update(
+                module.pack
+                for module in level
+                if any(dep.pack in postponed for dep in self.dependencies(module))
+            )
+        ready = [[m for m in level if m.pack not in postponed] for level in levels]
+        later = [[m for m in level if m.pack in postponed] for level in levels]
+        return [level for level in ready + later if level]
+
+    @staticmethod
+    def __install_missing(
+        installer: ThreadPoolExecutor, missing: dict[str, list[str]]
+    ) -> Future | None:
+        """
+        Install missing requirements of all modules in one resolver invocation.
+
+        :param installer: Executor running the installation.
+        :param missing: Dict of module pack to its missing requirements.
+        :return: Future of the installation, or None if nothing is missing.
+        """
+
+        if not missing:
+            return None
+        requirements = sorted(
+            {requirement for value in missing.values() for requirement in value}
+        )
+        logger.info(
+            f"Installing {len(requirements)} requirements for {len(missing)} modules: "
+            f"{', '.join(requirements)}"
+        )
+        return installer.submit(install_dependency, requirements=requirements)
+
+    def __deferred(self, modules: list[Module]) -> set[str]:
+        """
+        Get modules to load on their first trigger, a module with triggers is
+        still loaded eagerly if an eagerly loaded module depends on it, since
+        requiring the dependant would import it under the dependant's channel.
+
+        :param modules: Modules to load.
+        :return: Set of module packs.
+        """
+
+        if not config.loader.lazy:
+            return set()
+        deferred = {module.pack for module in modules if module.triggers}
+        eager = [module for module in modules if module.pack not in deferred]
+        while eager:
+            eager = [
+                dependency
+                for module in eager
+                for dependency in self.dependencies(module)
+                if dependency.pack in deferred
+            ]
+            deferred.difference_update(dependency.pack for dependency in eager)
+        return deferred
+
+    def __prefetch_level(
+        self, pool: ThreadPoolExecutor, level: list[Module], deferred: set[str]
+    ) -> list[Future]:
+        """
+        Prefetch modules of a level in the pool, while the previous level is required.
+
+        :param pool: Thread pool.
+        :param level: Modules of the level.
+        :param deferred: Packs of deferred modules, which are not prefetched.
+        :return: List of futures.
+        """
+
+        if config.loader.prefetch_workers <= 0:
+            return []
+        return [
+            pool.submit(self.__prefetch, module)
+            for module in level
+            if module.pack not in deferred
+        ]
+
+    @staticmethod
+    def __prefetch(module: Module) -> NoReturn:
+        """
+        Compile bytecode of a module and import its third-party requirements,
+        so the sequential require only finds cached modules.
+
+        :param module: Module object.
+        :return: None
+        """
+
+        with profiler.measure(module.pack, "prefetch"):
+            path = Path(Path().resolve(), *module.pack.split("."))
+            if path.is_dir():
+                compileall.compile_dir(path, quiet=1)
+            elif (file := path.with_suffix(".py")).is_file():
+                compileall.compile_file(file, quiet=1)
+            for requirement in read_requirements(module):
+                for name in import_names(requirement):
+                    if name.startswith("_"):
+                        continue
+                    try:
+                        importlib.import_module(name)
+                    except Exception as e:
+                        logger.debug(
+                            f"Failed to prefetch {name} for {module.pack}: {e}"
+                        )
+
+    def __require_in_context(self, module: Module, saya: Saya, log: bool) -> NoReturn:
         with saya.module_context():
-            for module in modules:
-                if not module.loaded:
-                    continue
-                self.require_module(module, saya, log_exception)
+            self.require_module(module, saya, log)
 
     def require_module(
         self, module: Module, saya: Saya, log: bool, retries: int = 1
@@ -93,9 +280,11 @@ class Modules:
         """
 
         try:
-            saya.require(module.pack)
+            with profiler.measure(module.pack, "import"):
+                saya.require(module.pack)
         except ModuleNotFoundError as e:
-            install_dependency(module)
+            with profiler.measure(module.pack, "install"):
+                install_dependency(module)
             if retries > 0:
                 retries -= 1
                 return self.require_module(module, saya, log, retries - 1)
@@ -116,8 +305,7 @@ class Modules:
         :return: None
         """
 
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.require_modules, saya, log_exception)
+        await executors.run("module", self.require_modules, saya, log_exception)
 
     async def async_require_module(
         self, module: Module, saya: Saya, log: bool, retries: int = 1
@@ -132,10 +320,7 @@ class Modules:
         :return: None
         """
 
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None, self.require_module, module, saya, log, retries
-        )
+        await executors.run("module", self.require_module, module, saya, log, retries)
 
     def load(self, reorder: bool = True) -> NoReturn:
         """
@@ -146,37 +331,214 @@ class Modules:
         """
 
         __modules: list[Module] = []
-        for path in Path(os.path.dirname(__file__)).iterdir():
-            if path.name.startswith("_"):
-                continue
+        __paths = self.__entries()
+        for path in __paths:
             if module := ModuleMetadata.read_and_update(path, path.is_dir()):
                 __modules.append(module)
+        ModuleMetadata.prune(__paths)
         self.__all__ = __modules
+        self.__generation += 1
         if not reorder:
-            return
+            self.__build_index()
         else:
             self.reorder()
 
+    @staticmethod
+    def __entries() -> list[Path]:
+        return [
+            path
+            for path in Path(os.path.dirname(__file__)).iterdir()
+            if not path.name.startswith("_")
+        ]
+
+    def __restore(self) -> bool:
+        """
+        Restore modules from the registry snapshot written by the last boot,
+        the snapshot is only trusted if the module directory listing and the
+        mtime and size of every metadata file are unchanged.
+
+        :return: Whether the snapshot was used.
+        """
+
+        try:
+            with self.__registry.open("r", encoding="utf-8") as f:
+                registry = json.loads(f.read())
+            if registry.get("fields") != list(Module.__fields__):
+                return False
+            entries: dict[str, list] = registry["entries"]
+            paths = self.__entries()
+            if {path.name for path in paths} != set(entries):
+                return False
+            for path in paths:
+                signature = ModuleMetadata.signature(path, path.is_dir())
+                if signature is None or list(signature) != entries[path.name][:2]:
+                    return False
+            __modules = [Module.construct(**record) for record in registry["modules"]]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return False
+        __packs = {module.pack: module for module in __modules}
+        for path in paths:
+            if (module := __packs.get(entries[path.name][2], None)) is None:
+                return False
+            ModuleMetadata.remember(path, path.is_dir(), module)
+        self.__all__ = __modules
+        self.__generation += 1
+        self.reorder()
+        logger.info(f"Restored {len(__modules)} modules from {self.__registry.name}")
+        return True
+
+    def __dump(self) -> NoReturn:
+        """
+        Write the registry snapshot of the current modules in load order.
+
+        :return: None
+        """
+
+        entries = {}
+        for path in self.__entries():
+            module = ModuleMetadata.read_and_update(path, path.is_dir())
+            signature = ModuleMetadata.signature(path, path.is_dir())
+            if module is None or signature is None:
+                return
+            entries[path.name] = [*signature, module.pack]
+        atomic_write(
+            self.__registry,
+            json.dumps(
+                {
+                    "fields": list(Module.__fields__),
+                    "entries": entries,
+                    "modules": [module.dict() for module in self.__all__],
+                },
+                ensure_ascii=False,
+            ),
+        )
+
     def reorder(self) -> NoReturn:
         """
-        Reorder modules by dependency, common and unloaded modules.
+        Reorder modules topologically into load levels, every module only
+        depends on modules of earlier levels. Modules in or depending on a
+        dependency cycle are reported and put into a final level.
 
         :return: None
         """
 
-        __dependencies = []
-        for __has_dependency in self.search(match_any=True, dependency=True):
-            __dependencies.extend(
-                self.get(__dependency) for __dependency in __has_dependency.dependency
-            )
-        __dependencies = list(set(__dependencies))
-        __dependencies.sort(key=lambda x: x.pack)
-        __unloaded = self.__search_by_loaded(False)
-        __unloaded.sort(key=lambda x: x.pack)
-        __common = list(set(self.__all__) - set(__dependencies) - set(__unloaded))
-        __common.sort(key=lambda x: x.pack)
-        __modules = __dependencies + __common + __unloaded
-        self.__all__ = __modules
+        self.__build_index()
+        __packs = {module.pack: module for module in self.__all__}
+        __dependencies = {
+            pack: {
+                dependency.pack
+                for dependency in self.dependencies(module)
+                if dependency.pack != pack
+            }
+            for pack, module in __packs.items()
+        }
+        __dependants: dict[str, list[str]] = {}
+        for pack, dependencies in __dependencies.items():
+            for dependency in dependencies:
+                __dependants.setdefault(dependency, []).append(pack)
+        __degree = {pack: len(deps) for pack, deps in __dependencies.items()}
+        __level = sorted(pack for pack, degree in __degree.items() if degree == 0)
+        __levels: list[list[Module]] = []
+        while __level:
+            __levels.append([__packs[pack] for pack in __level])
+            __next = []
+            for pack in __level:
+                for dependant in __dependants.get(pack, []):
+                    __degree[dependant] -= 1
+                    if __degree[dependant] == 0:
+                        __next.append(dependant)
+            __level = sorted(__next)
+        if __remaining := sorted(pack for pack, degree in __degree.items() if degree):
+            __cycle = self.__find_cycle(__remaining, __dependencies)
+            logger.error(f"Circular dependency detected: {' -> '.join(__cycle)}")
+            __levels.append([__packs[pack] for pack in __remaining])
+        self.__levels = __levels
+        self.__all__ = [module for level in __levels for module in level]
+        self.__build_index()
+
+    @staticmethod
+    def __find_cycle(
+        remaining: list[str], dependencies: dict[str, set[str]]
+    ) -> list[str]:
+        """
+        Find a cycle among modules left over by the topological sort, every
+        one of them has at least one dependency that is also left over.
+
+        :param remaining: Packs of the left over modules.
+        :param dependencies: Dependencies of every module.
+        :return: Packs forming the cycle, the first pack is repeated at the end.
+        """
+
+        __remaining = set(remaining)
+        __path: list[str] = []
+        __seen: dict[str, int] = {}
+        pack = remaining[0]
+        while pack not in __seen:
+            __seen[pack] = len(__path)
+            __path.append(pack)
+            pack = min(dependencies[pack] & __remaining)
+        return __path[__seen[pack] :] + [pack]
+
+    @property
+    def levels(self) -> list[list[Module]]:
+        """
+        Modules grouped into load levels by dependency.
+
+        :return: List of levels.
+        """
+
+        return self.__levels
+
+    @staticmethod
+    def __name_keys(module: Module) -> set[str]:
+        return {
+            module.name.lower(),
+            module.pack.lower().split(".", maxsplit=1)[-1],
+            module.name.lower().replace(" ", "").split(".", maxsplit=1)[-1],
+        }
+
+    @staticmethod
+    def __pack_keys(module: Module) -> set[str]:
+        return {
+            module.pack.lower(),
+            module.pack.lower().split(".", maxsplit=1)[-1],
+            module.name.lower().replace(" ", "").split(".", maxsplit=1)[-1],
+        }
+
+    @staticmethod
+    def __dependency_keys(dependency: str) -> set[str]:
+        return {dependency.lower(), dependency.lower().split(".", maxsplit=1)[-1]}
+
+    def __build_index(self) -> NoReturn:
+        """
+        Rebuild lookup indexes, keys are normalised the same way as search input.
+
+        :return: None
+        """
+
+        index: dict[str, dict[str, list[Module]]] = {
+            "name": {},
+            "pack": {},
+            "lookup": {},
+            "author": {},
+            "category": {},
+            "dependency": {},
+        }
+
+        def __add(field: str, keys: set[str], module: Module):
+            for key in keys:
+                index[field].setdefault(key, []).append(module)
+
+        for module in self.__all__:
+            __add("name", self.__name_keys(module), module)
+            __add("pack", self.__pack_keys(module), module)
+            __add("lookup", self.__name_keys(module) | self.__pack_keys(module), module)
+            __add("author", {author.lower() for author in module.author}, module)
+            __add("category", {cat.lower() for cat in module.category}, module)
+            for dependency in module.dependency or []:
+                __add("dependency", self.__dependency_keys(dependency), module)
+        self.__index = index
+        self.__position = {module.pack: i for i, module in enumerate(self.__all__)}
 
     def get(self, name: str) -> None | Module:
         """
@@ -186,7 +548,7 @@ class Modules:
         :return: Module object.
         """
 
-        if __modules := self.search(match_any=True, name=name, pack=name):
+        if __modules := self.__index["lookup"].get(name.lower(), None):
             return __modules[0]
 
     def add(self, module: Module) -> NoReturn:
@@ -198,6 +560,8 @@ class Modules:
         """
 
         self.__all__.append(module)
+        self.__generation += 1
+        self.__build_index()
 
     @staticmethod
     def __remove_dir(path: Path) -> NoReturn:
@@ -229,7 +593,9 @@ class Modules:
         if not (module := self.get(pack)):
             return False
         path = Path(Path().resolve(), *module.pack.split("."))
-        self.__all__ = list(filter(lambda x: x.pack != pack, self.__all__))
+        self.__all__ = list(filter(lambda x: x.pack != module.pack, self.__all__))
+        self.__generation += 1
+        self.__build_index()
         self.__remove_dir(path)
         if keep_data:
             return True
@@ -272,213 +638,73 @@ class Modules:
             and not isinstance(loaded, bool)
         ):
             raise ValueError("No search criteria provided")
-        kwargs = {
-            "name": name,
-            "pack": pack,
-            "author": author,
-            "pypi": pypi,
-            "category": category,
-            "dependency": dependency,
-            "loaded": loaded,
-        }
-        kwargs = {k: v for k, v in kwargs.items() if v is not None}
-        if match_any:
-            return self.__search_match_any(**kwargs)
-        return self.__search_match_all(
-            name=name,
-            pack=pack,
-            author=author,
-            pypi=pypi,
-            category=category,
-            dependency=dependency,
-            loaded=loaded,
-        )
-
-    def __search_match_all(self, **kwargs) -> list[Module]:
-        """
-        Search module by multiple fields.
-
-        :param kwargs: Search criteria.
-        """
-
-        query = self.__all__
-        if "name" in kwargs:
-            query = self.__search_by_name(kwargs.get("name"), query)
-        if "pack" in kwargs:
-            query = self.__search_by_pack(kwargs.get("pack"), query)
-        if "author" in kwargs:
-            query = self.__search_by_author(kwargs.get("author"), query)
-        if "pypi" in kwargs:
-            query = self.__search_by_pypi(kwargs.get("pypi"), query)
-        if "category" in kwargs:
-            query = self.__search_by_category(kwargs.get("category"), query)
-        if "dependency" in kwargs:
-            query = self.__search_by_dependency(kwargs.get("dependency"), query)
-        if "loaded" in kwargs:
-            query = self.__search_by_loaded(kwargs.get("loaded"), query)
-        return query
-
-    def __search_match_any(self, **kwargs) -> list[Module]:
-        """
-        Search module by multiple fields.
-
-        :param kwargs: Search criteria.
-        """
-
-        query = []
-        if "name" in kwargs:
-            query += self.__search_by_name(kwargs.get("name"))
-        if "pack" in kwargs:
-            query += self.__search_by_pack(kwargs.get("pack"))
-        if "author" in kwargs:
-            query += self.__search_by_author(kwargs.get("author"))
-        if "pypi" in kwargs:
-            query += self.__search_by_pypi(kwargs.get("pypi"))
-        if "category" in kwargs:
-            query += self.__search_by_category(kwargs.get("category"))
-        if "dependency" in kwargs:
-            query += self.__search_by_dependency(kwargs.get("dependency"))
-        if "loaded" in kwargs:
-            query += self.__search_by_loaded(kwargs.get("loaded"))
-        return list(set(query))
-
-    def __search(self, func: callable, field: list[Module] = None) -> list[Module]:
-        """
-        Search module by field.
-
-        :param func: Function to search.
-        :param field: Field to search.
-        :return: List of modules.
-        """
-
-        if field is None:
-            field = self.__all__
-        return module if (module := list(filter(func, field))) else []
-
-    def __search_by_name(self, name: str, field: list[Module] = None) -> list[Module]:
-        """
-        Search module by name.
-
-        :param name: Module name.
-        :param field: Field to search.
-        :return: List of modules.
-        """
-
-        return self.__search(
-            lambda x: any(
-                [
-                    name.lower() == x.name.lower(),
-                    name.lower() == x.pack.lower().split(".", maxsplit=1)[-1],
-                    name.lower()
-                    == x.name.lower().replace(" ", "").split(".", maxsplit=1)[-1],
-                ]
-            ),
-            field,
-        )
-
-    def __search_by_pack(self, pack: str, field: list[Module] = None) -> list[Module]:
-        """
-        Search module by pack.
-
-        :param pack: Module pack.
-        :param field: Field to search.
-        :return: List of modules.
-        """
-
-        return self.__search(
-            lambda x: any(
-                [
-                    pack.lower() == x.pack.lower(),
-                    pack.lower() == x.pack.lower().split(".", maxsplit=1)[-1],
-                    pack.lower()
-                    == x.name.lower().replace(" ", "").split(".", maxsplit=1)[-1],
-                ]
-            ),
-            field,
-        )
-
-    def __search_by_author(
-        self, author: str, field: list[Module] = None
-    ) -> list[Module]:
-        """
-        Search module by author.
-
-        :param author: Module author.
-        :param field: Field to search.
-        :return: List of modules.
-        """
-
-        return self.__search(
-            lambda x: author.lower() in map(lambda y: y.lower(), x.author),
-            field,
-        )
-
-    def __search_by_pypi(self, pypi: bool, field: list[Module] = None) -> list[Module]:
-        """
-        Search module by dependency on PyPI.
-
-        :param pypi: Module has dependency on PyPI.
-        :param field: Field to search.
-        :return: List of modules.
-        """
-
-        return self.__search(lambda x: x.pypi == pypi, field)
+        matches: list[set[str]] = []
+        for field, value in (
+            ("name", name),
+            ("pack", pack),
+            ("author", author),
+            ("category", category),
+        ):
+            if value is not None:
+                matches.append(self.__lookup(field, value.lower()))
+        if isinstance(dependency, bool):
+            matches.append(
+                {
+                    module.pack
+                    for module in self.__all__
+                    if bool(module.dependency) is dependency
+                }
+            )
+        elif dependency is not None:
+            matches.append(self.__lookup("dependency", dependency.lower()))
+        if pypi is not None:
+            matches.append(
+                {module.pack for module in self.__all__ if module.pypi == pypi}
+            )
+        if loaded is not None:
+            matches.append(
+                {module.pack for module in self.__all__ if module.loaded == loaded}
+            )
+        result = set.union(*matches) if match_any else set.intersection(*matches)
+        return [
+            self.__all__[self.__position[pack]]
+            for pack in sorted(result, key=self.__position.get)
+        ]
 
-    def __search_by_category(
-        self, category: str, field: list[Module] = None
-    ) -> list[Module]:
+    def __lookup(self, field: str, key: str) -> set[str]:
         """
-        Search module by category.
+        Look up packs of modules in an index.
 
-        :param category: Module category.
-        :param field: Field to search.
-        :return: List of modules.
+        :param field: Index name.
+        :param key: Normalised key.
+        :return: Set of module packs.
         """
 
-        return self.__search(
-            lambda x: category.lower() == x.category.lower(),
-            field,
-        )
+        return {module.pack for module in self.__index[field].get(key, [])}
 
-    def __search_by_dependency(
-        self, dependency: str | bool, field: list[Module] = None
-    ) -> list[Module]:
+    def dependencies(self, module: Module) -> list[Module]:
         """
-        Search module by dependency.
+        Get installed dependencies of a module.
 
-        :param dependency: Module dependency.
-        :param field: Field to search.
+        :param module: Module object.
         :return: List of modules.
         """
 
-        return self.__search(
-            lambda x: any(
-                [
-                    isinstance(dependency, bool) and x.dependency,
-                    isinstance(dependency, str)
-                    and dependency.lower() in map(lambda y: y.lower(), x.dependency),
-                    isinstance(dependency, str)
-                    and dependency.lower()
-                    in map(
-                        lambda y: y.lower().split(".", maxsplit=1)[-1], x.dependency
-                    ),
-                ]
-            ),
-            field,
-        )
+        return [
+            dependency
+            for name in module.dependency or []
+            if (dependency := self.get(name))
+        ]
 
-    def __search_by_loaded(
-        self, loaded: bool, field: list[Module] = None
-    ) -> list[Module]:
+    def dependants(self, module: Module) -> list[Module]:
         """
-        Search module by loaded.
+        Get installed modules depending on a module.
 
-        :param loaded: Module is loaded.
-        :param field: Field to search.
+        :param module: Module object.
         :return: List of modules.
         """
 
-        return self.__search(lambda x: x.loaded == loaded, field)
+        return self.search(match_any=True, dependency=module.pack)
 
     def get_categories(self) -> list[str]:
         """
@@ -494,6 +720,8 @@ class Modules:
 
 
 class ModuleMetadata:
+    __cache: dict[Path, tuple[tuple[int, int] | None, Module]] = {}
+
     def __new__(cls, *args, **kwargs):
         raise NotImplementedError("ModuleMetadata is not meant to be instantiated.")
 
@@ -530,23 +758,69 @@ class ModuleMetadata:
         )
 
     @staticmethod
-    def write(file: Path, module: Module) -> NoReturn:
+    def __signature(file: Path) -> tuple[int, int] | None:
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def signature(cls, file: Path, is_dir: bool = False) -> tuple[int, int] | None:
+        """
+        Returns the mtime and size of the metadata of the given file or directory.
+
+        :param file: The file or directory of the module.
+        :param is_dir: Whether the file is a directory.
+        :return: Tuple of mtime in nanoseconds and size, or None if there is no metadata.
         """
-        Writes the metadata to the given file.
+
+        return cls.__signature(cls.__get_metadata_dir(file, is_dir))
+
+    @classmethod
+    def remember(cls, file: Path, is_dir: bool, module: Module) -> NoReturn:
+        """
+        Cache a module restored from elsewhere as the parsed metadata of the
+        given file or directory.
+
+        :param file: The file or directory of the module.
+        :param is_dir: Whether the file is a directory.
+        :param module: The module.
+        :return: None.
+        """
+
+        metadata_dir = cls.__get_metadata_dir(file, is_dir)
+        cls.__cache[metadata_dir] = (cls.__signature(metadata_dir), module)
+
+    @staticmethod
+    def write(file: Path, module: Module, content: str = None) -> bool:
+        """
+        Writes the metadata to the given file, skipped if the file already
+        has the same content.
 
         :param file: The file to write the metadata to.
         :param module: The module to write the metadata from.
-        :return: None.
+        :param content: Current content of the file, read from disk if not given.
+        :return: Whether the file was written.
         """
 
+        data = module.json(indent=4, ensure_ascii=False)
+        if content is None and file.is_file():
+            content = file.read_text(encoding="utf-8")
+        if data == content:
+            return False
         with file.open("w", encoding="utf-8") as f:
-            f.write(module.json(indent=4, ensure_ascii=False))
+            f.write(data)
+        return True
 
     @classmethod
     def read_and_update(cls, file: Path, is_dir: bool = False) -> Module | None:
         """
         Reads the metadata from the given file or directory and updates the module with the metadata.
 
+        The parsed module is cached by the mtime and size of the metadata file,
+        an unchanged file returns the cached module without parsing it again.
+
         :param file: The file or directory to read the metadata from.
         :param is_dir: Whether the file is a directory.
         :return: The module with the updated metadata.
@@ -554,11 +828,15 @@ class ModuleMetadata:
 
         metadata_dir = cls.__get_metadata_dir(file, is_dir)
         req_dir = cls.__get_requirements_dir(file, is_dir)
+        signature = cls.__signature(metadata_dir)
+        if (cached := cls.__cache.get(metadata_dir, None)) and cached[0] == signature:
+            return cached[1]
         module = None
+        content = None
         try:
             with metadata_dir.open("r", encoding="utf-8") as f:
-                content = json.loads(f.read())
-                module = Module(**content)
+                content = f.read()
+                module = Module(**json.loads(content))
         except (ValidationError, FileNotFoundError):
             logger.error(f"Validation failed for module/{file.stem}")
             module = Module(
@@ -568,8 +846,24 @@ class ModuleMetadata:
             )
         finally:
             if module:
-                cls.write(metadata_dir, module)
+                if cls.write(metadata_dir, module, content):
+                    signature = cls.__signature(metadata_dir)
+                cls.__cache[metadata_dir] = (signature, module)
                 return module
 
+    @classmethod
+    def prune(cls, files: list[Path]) -> NoReturn:
+        """
+        Drop cached metadata of modules that are not in the given list.
+
+        :param files: Module files or directories to keep.
+        :return: None.
+        """
+
+        keep = {cls.__get_metadata_dir(file, file.is_dir()) for file in files}
+        for metadata_dir in list(cls.__cache):
+            if metadata_dir not in keep:
+                del cls.__cache[metadata_dir]
+
 
 modules = Modules()
@@ -4,6 +4,7 @@ from .exception import HubServiceNotEnabled
 if not config.hub.enabled:
     raise HubServiceNotEnabled
 
+from graia.ariadne.event.lifecycle import ApplicationLaunched, ApplicationShutdown
 from graia.ariadne.event.mirai import (
     BotOnlineEvent,
     BotOfflineEventActive,
@@ -26,6 +27,16 @@ channel.author("nullqwertyuiop")
 channel.description("")
 
 
+@channel.use(ListenerSchema(listening_events=[ApplicationLaunched]))
+async def hub_service_startup():
+    await hs.initialize()
+
+
+@channel.use(ListenerSchema(listening_events=[ApplicationShutdown]))
+async def hub_service_shutdown():
+    await hs.close()
+
+
 @channel.use(SchedulerSchema(timer=timers.every_minute()))
 async def hub_service_heartbeat_report():
     if hs.get_auth_header():
@@ -3,3 +3,17 @@ class HubServiceNotEnabled(Exception):
 
     def __init__(self):
         super().__init__("HubService 未启用")
+
+
+class ChecksumMismatch(Exception):
+    """下载文件校验失败"""
+
+    def __init__(self, name: str, expected: str, actual: str):
+        super().__init__(f"{name} 校验失败，期望 SHA-256 {expected}，实际为 {actual}")
+
+
+class ChecksumMissing(Exception):
+    """下载文件缺少校验值"""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} 缺少 SHA-256 校验值，已拒绝下载")
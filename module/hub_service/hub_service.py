@@ -5,38 +5,73 @@ if not config.hub.enabled:
     raise HubServiceNotEnabled()
 
 import aiohttp
-import requests
+import asyncio
+import hashlib
+import random
+import time
 import urllib.parse
-from typing import Literal, List, Union
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Literal, List, Union
 from aiohttp import ClientResponseError
 from graia.ariadne import Ariadne
 from graia.ariadne.exception import AccountMuted, UnknownTarget
 from graia.ariadne.message.chain import MessageChain
+from loguru import logger
 
+from library.executor import executors
 from library.model import HubMetadata, Module
+from .exception import ChecksumMismatch, ChecksumMissing
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+INITIALIZE_RETRY_MAX = 300
 
 
 class HubService:
     __auth__: dict = {}
     __initialized__: bool = False
-    __session__: requests.session() = None
+    __init_step__: int = 0
+    __init_task__: asyncio.Task = None
     __aio_session__: aiohttp.ClientSession = None
+    __versions__: dict[str, tuple[float, Module]] = {}
 
-    def __init__(self):
-        self.__session__ = requests.session()
-        self.update_metadata()
-        self.register_bot()
-        self.authorize()
+    async def initialize(self, attempt: int = 0):
+        steps = (
+            self.async_update_metadata,
+            self.async_register_bot,
+            self.async_authorize,
+        )
+        try:
+            for step in steps[self.__init_step__ :]:
+                await step()
+                self.__init_step__ += 1
+        except Exception as e:
+            delay = min(
+                INITIALIZE_RETRY_MAX, config.hub.backoff * 2 ** (attempt + 4)
+            ) * random.uniform(0.5, 1)
+            logger.error(
+                f"Failed to initialize hub service, retrying in {delay:.0f}s: {e!r}"
+            )
+            self.__init_task__ = asyncio.create_task(
+                self.__reinitialize(attempt + 1, delay)
+            )
+            return
         self.__initialized__ = True
 
-    def update_metadata(self):
-        with self.__session__.get(url=config.hub.url + config.hub.meta) as resp:
-            config.hub.metadata = HubMetadata(**resp.json())
+    async def __reinitialize(self, attempt: int, delay: float):
+        await asyncio.sleep(delay)
+        await self.initialize(attempt)
+
+    async def async_update_metadata(self):
+        async with self.request("GET", config.hub.url + config.hub.meta) as resp:
+            config.hub.metadata = HubMetadata(**await resp.json())
             config.save()
 
-    def register_bot(self):
-        with self.__session__.post(
-            url=config.hub.url
+    async def async_register_bot(self):
+        async with self.request(
+            "POST",
+            config.hub.url
             + config.hub.metadata.register_bot
             + "?secret="
             + config.hub.secret,
@@ -48,32 +83,14 @@ class HubService:
                 "owners": config.owners,
             },
         ) as resp:
-            data = resp.json()
+            data = await resp.json()
             config.num = data["num"]
             config.save()
 
-    def authorize(self):
-        with self.__session__.post(
-            url=config.hub.url + config.hub.metadata.authorize,
-            data={"username": config.account, "password": config.hub.secret},
-        ) as resp:
-            if resp.status_code == 200:
-                self.__auth__ = {
-                    "Authorization": f"Bearer {resp.json()['access_token']}"
-                }
-
-    async def async_update_metadata(self):
-        await self.check_session()
-        async with self.__aio_session__.get(
-            url=config.hub.url + config.hub.meta,
-        ) as resp:
-            config.hub.metadata = HubMetadata(**await resp.json())
-            config.save()
-
     async def async_authorize(self):
-        await self.check_session()
-        async with self.__aio_session__.post(
-            url=config.hub.url + config.hub.metadata.authorize,
+        async with self.request(
+            "POST",
+            config.hub.url + config.hub.metadata.authorize,
             data={"username": config.account, "password": config.hub.secret},
         ) as resp:
             if resp.status == 200:
@@ -85,9 +102,10 @@ class HubService:
         return self.__auth__
 
     async def heartbeat(self):
-        await self.check_session()
-        async with self.__aio_session__.post(
-            url=config.hub.url + config.hub.metadata.heartbeat, headers=self.__auth__
+        async with self.request(
+            "POST",
+            config.hub.url + config.hub.metadata.heartbeat,
+            headers=self.__auth__,
         ) as resp:
             if bots := await resp.json():
                 ariadne = Ariadne.current()
@@ -127,9 +145,9 @@ class HubService:
         return notified
 
     async def notified_missing(self, bot_id: int):
-        await self.check_session()
-        async with self.__aio_session__.post(
-            url=config.hub.url
+        async with self.request(
+            "POST",
+            config.hub.url
             + config.hub.metadata.notified_missing
             + f"?bot_id={bot_id}",
             headers=self.__auth__,
@@ -137,9 +155,9 @@ class HubService:
             await resp.json()
 
     async def event_report(self, event_type: Literal["online", "offline"]):
-        await self.check_session()
-        async with self.__aio_session__.post(
-            url=config.hub.url
+        async with self.request(
+            "POST",
+            config.hub.url
             + (
                 config.hub.metadata.online_event
                 if event_type == "online"
@@ -159,7 +177,6 @@ class HubService:
         category: Literal["utility", "entertainment", "misc"] = "",
         dependency: str = "",
     ) -> Union[None, List[Module]]:
-        await self.check_session()
         if not any(
             [name, pack, version, author, isinstance(pypi, bool), category, dependency]
         ):
@@ -183,27 +200,199 @@ class HubService:
             if isinstance(pypi, bool):
                 params.append(f"pypi={pypi}")
             params = f"?{'&'.join(params)}"
-        async with self.__aio_session__.get(
-            url=config.hub.url + config.hub.metadata.search_module + params,
+        async with self.request(
+            "GET",
+            config.hub.url + config.hub.metadata.search_module + params,
             headers=self.__auth__,
         ) as resp:
             return [Module(**mod) for mod in (await resp.json())]
 
-    async def download_module(self, name: str, version: str = "") -> Union[bytes, None]:
-        await self.check_session()
+    async def check_versions(self, packs: List[str]) -> dict[str, Module]:
+        now = time.monotonic()
+        stale = [
+            pack
+            for pack in dict.fromkeys(packs)
+            if now - self.__versions__.get(pack, (-config.hub.version_ttl, None))[0]
+            >= config.hub.version_ttl
+        ]
+        if stale:
+            try:
+                latest = await self.bulk_version(stale)
+            except Exception as e:
+                logger.warning(f"Bulk version check failed, searching instead: {e!r}")
+                latest = None
+            if latest is None:
+                latest = await self.search_versions(stale)
+            for pack in stale:
+                if (module := latest.get(pack, None)) is None:
+                    self.__versions__.pop(pack, None)
+                else:
+                    self.__versions__[pack] = (now, module)
+        return {
+            pack: self.__versions__[pack][1]
+            for pack in packs
+            if pack in self.__versions__
+        }
+
+    async def bulk_version(self, packs: List[str]) -> dict[str, Module] | None:
+        if not config.hub.metadata.bulk_version:
+            return None
+        async with self.request(
+            "POST",
+            config.hub.url + config.hub.metadata.bulk_version,
+            json={"packs": packs},
+            headers=self.__auth__,
+            retries=config.hub.retries,
+        ) as resp:
+            if resp.status != 200:
+                return None
+            return {
+                module.pack: module
+                for module in (Module(**mod) for mod in await resp.json())
+            }
+
+    async def search_versions(self, packs: List[str]) -> dict[str, Module]:
+        semaphore = asyncio.Semaphore(config.hub.concurrency)
+
+        async def __search(pack: str) -> Module | None:
+            async with semaphore:
+                modules = await self.search_module(name=pack)
+            return next(
+                (module for module in modules or [] if module.pack == pack), None
+            )
+
+        results = await asyncio.gather(*(__search(pack) for pack in packs))
+        return {pack: module for pack, module in zip(packs, results) if module}
+
+    def invalidate_versions(self):
+        self.__versions__.clear()
+
+    async def stream_module(
+        self,
+        name: str,
+        target: Path,
+        version: str = "",
+        expected: str = None,
+        progress: Callable[[int, int | None], None] = None,
+        chunk_size: int = 64 * 1024,
+    ) -> str | None:
         params = f"?name={urllib.parse.quote(name.replace('-', '_'))}" + (
             f"&version={urllib.parse.quote(version)}" if version else ""
         )
-        async with self.__aio_session__.get(
-            url=config.hub.url + config.hub.metadata.download_module + params,
+        async with self.request(
+            "GET",
+            config.hub.url + config.hub.metadata.download_module + params,
             headers=self.__auth__,
+            timeout=self.download_timeout(),
         ) as resp:
-            return await resp.read() if resp.status == 200 else None
+            if resp.status != 200:
+                return None
+            if not (
+                expected := expected or resp.headers.get("X-Checksum-SHA256", None)
+            ):
+                if config.hub.require_checksum:
+                    raise ChecksumMissing(name)
+                logger.warning(f"Downloading {name} without SHA-256 verification")
+            total = resp.content_length
+            done = 0
+            digest = hashlib.sha256()
+            await executors.run(
+                "download", target.parent.mkdir, parents=True, exist_ok=True
+            )
+            f = await executors.run("download", target.open, "wb")
+            try:
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    digest.update(chunk)
+                    await executors.run("download", f.write, chunk)
+                    done += len(chunk)
+                    if progress:
+                        progress(done, total)
+                await executors.run("download", f.close)
+                if expected and digest.hexdigest() != expected.lower():
+                    raise ChecksumMismatch(name, expected, digest.hexdigest())
+            except BaseException:
+                f.close()
+                target.unlink(missing_ok=True)
+                raise
+        return digest.hexdigest()
+
+    @staticmethod
+    def download_timeout() -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=None, connect=config.hub.connect_timeout, sock_read=config.hub.timeout
+        )
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: str = None) -> float:
+        delay = random.uniform(
+            0, min(config.hub.backoff_max, config.hub.backoff * 2**attempt)
+        )
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(config.hub.backoff_max, float(retry_after)))
+        return delay
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: aiohttp.ClientTimeout = None,
+        retries: int = None,
+        **kwargs,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        await self.check_session()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        if retries is None:
+            retries = config.hub.retries if method.upper() in IDEMPOTENT_METHODS else 0
+        endpoint = url.split("?", maxsplit=1)[0]
+        attempt = 0
+        while True:
+            try:
+                resp = await self.__aio_session__.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(
+                    f"{method} {endpoint} failed: {e!r}, retrying in {delay:.2f}s"
+                )
+            else:
+                if resp.status not in RETRY_STATUS or attempt >= retries:
+                    break
+                delay = self.backoff(attempt, resp.headers.get("Retry-After", None))
+                resp.release()
+                logger.warning(
+                    f"{method} {endpoint} returned {resp.status}, retrying in {delay:.2f}s"
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+        try:
+            yield resp
+        finally:
+            resp.release()
 
     async def check_session(self):
-        if self.__aio_session__:
+        if self.__aio_session__ and not self.__aio_session__.closed:
             return
-        self.__aio_session__ = aiohttp.ClientSession()
+        self.__aio_session__ = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=config.hub.connection_limit,
+                keepalive_timeout=config.hub.keepalive,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=config.hub.timeout, connect=config.hub.connect_timeout
+            ),
+        )
+
+    async def close(self):
+        if self.__init_task__ and not self.__init_task__.done():
+            self.__init_task__.cancel()
+        if self.__aio_session__ and not self.__aio_session__.closed:
+            await self.__aio_session__.close()
+        self.__aio_session__ = None
 
 
 hs = HubService()
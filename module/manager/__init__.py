@@ -16,15 +16,22 @@ from graia.ariadne.message.parser.twilight import (
 )
 from graia.saya import Saya, Channel
 from graia.saya.builtins.broadcast import ListenerSchema
+from graia.scheduler import timers
+from graia.scheduler.saya import SchedulerSchema
 
+from library.accounting import accounting
 from library.config import config
 from library.depend import Permission, FunctionCall
+from library.executor import executors
 from library.help import HelpMenu
 from library.image.oneui_mock.elements import HintBox
 from library.model import UserPerm
+from library.util.lazy import lazy
 from library.util.switch import switch
+from library.util.watcher import reload_config
 from module import modules as __modules
-from .module.install import install_module
+from .module.install import install_modules
+from .module.reload import reloader
 from .module.search import search
 from .module.switch import module_switch_msg
 from library.orm import db_init
@@ -56,6 +63,7 @@ channel.description("")
                         "load",
                         "reload",
                         "unload",
+                        "stats",
                         # "search",
                         # "upgrade",
                         # "安装",
@@ -63,6 +71,7 @@ channel.description("")
                         "加载",
                         "重载",
                         "卸载",
+                        "统计",
                         # "搜索",
                         # "升级",
                         # ).help(
@@ -134,6 +143,8 @@ async def module_manager_owner(
         msg = await reload_module(name=name)
     elif function in {"unload", "卸载"}:
         msg = await unload_module(name=name)
+    elif function in {"stats", "统计"}:
+        msg = plugin_stats()
     # elif function in {"uninstall", "删除"}:
     #     pass
     # elif function in {"upgrade", "升级"}:
@@ -225,8 +236,10 @@ async def config_manager_admin(
         # TODO add update_module
         pass
     elif func in ("reload", "重载"):
-        config.reload()
-        msg = MessageChain("成功重载配置")
+        if changed := reload_config():
+            msg = MessageChain(f"成功重载配置，已更新：{', '.join(changed)}")
+        else:
+            msg = MessageChain("成功重载配置，没有发生变化")
     if msg:
         await app.send_message(
             event.sender.group if isinstance(event, GroupMessage) else event.sender, msg
@@ -252,6 +265,15 @@ async def list_module(group: int = None) -> MessageChain:
             ),
         )
     ]
+    switch_matrix = switch.matrix
+    enabled_modules = set(switch_matrix.enabled_modules(group)) if group else set()
+    group_counts = (
+        {}
+        if group
+        else switch_matrix.module_counts(
+            [g.id for g in await Ariadne.current().get_group_list()]
+        )
+    )
     for index, module in enumerate(enabled + disabled):
         module_category = (
             "实用工具"
@@ -263,12 +285,12 @@ async def list_module(group: int = None) -> MessageChain:
         module_dependency = ", ".join(module.dependency) if module.dependency else "无"
         if group:
             if module.pack != channel.module:
-                _switch = switch.get(module.pack, group) and module.loaded
+                _switch = module.pack in enabled_modules and module.loaded
             else:
                 _switch = True
             switch_status = f"\n - 开关：{'已' if _switch else '未'}开启"
         else:
-            switch_status = ""
+            switch_status = f"\n - 开启群数：{group_counts.get(module.pack, 0)}"
         fwd_node_list.append(
             ForwardNode(
                 target=config.account,
@@ -295,6 +317,7 @@ async def list_module(group: int = None) -> MessageChain:
 async def load_module(name: str) -> MessageChain:
     reload_metadata()
     if module := __modules.get(name):
+        lazy.discard(module.pack)
         try:
             with saya.module_context():
                 saya.require(module.pack)
@@ -310,6 +333,11 @@ async def load_module(name: str) -> MessageChain:
 async def unload_module(name: str) -> MessageChain:
     reload_metadata()
     if module := __modules.get(name):
+        if not isinstance(module.override_default, bool) and lazy.discard(
+            module.pack
+        ):
+            module.loaded = False
+            return MessageChain(f"已卸载插件 {name}")
         if chn := saya.channels.get(module.pack, None):
             if isinstance(module.override_default, bool):
                 return MessageChain(
@@ -322,30 +350,63 @@ async def unload_module(name: str) -> MessageChain:
 
 
 async def reload_module(name: str) -> MessageChain:
-    await unload_module(name)
-    return await load_module(name)
+    reload_metadata()
+    if not (module := __modules.get(name)):
+        return MessageChain(f"无法找到插件 {name}")
+    if module.pack not in saya.channels:
+        return await load_module(name)
+    try:
+        reloaded = await reloader.reload([module])
+    except Exception as e:
+        return MessageChain(f"重载插件 {name} 时发生错误：\n{e}")
+    return MessageChain(f"已重载插件 {', '.join(module.name for module in reloaded)}")
+
+
+def plugin_stats(top: int = 10) -> MessageChain:
+    stats = accounting.stats()
+    path = accounting.dump()
+    if not stats:
+        return MessageChain("暂无插件运行数据")
+    lines = [f"插件运行统计（前 {min(top, len(stats))} 项，完整数据见 {path.name}）"]
+    for pack, record in list(stats.items())[:top]:
+        calls = record["calls"] or 1
+        lines.append(
+            f"\n{pack}"
+            f"\n  调用 {record['calls']} 次，过滤 {record['filtered']} 次，异常 {record['errors']} 次"
+            f"\n  平均耗时 {record['wall'] / calls * 1000:.1f}ms，"
+            f"CPU {record['cpu'] / calls * 1000:.1f}ms，"
+            f"Depends {record['depend'] / calls * 1000:.1f}ms"
+        )
+    for name, metrics in executors.metrics().items():
+        lines.append(
+            f"\n执行器 {name}：运行 {metrics['active']}/{metrics['max_workers']}，"
+            f"排队 {metrics['queued']}，等待 {metrics['waiting']}，"
+            f"完成 {metrics['completed']}，失败 {metrics['failed']}"
+        )
+    return MessageChain("".join(lines))
 
 
 async def upgrade_module(force: bool = False) -> MessageChain:
     reload_metadata()
-    msg = []
-    for mod in list(__modules):
-        if modules := await hs.search_module(name=mod.pack):
-            if modules[0].version == mod.version and not force:
-                continue
-            msg.append(
-                await install_module(
-                    name=mod.pack, version=modules[0].version, upgrade=True
-                )
-            )
-        continue
+    latest = await hs.check_versions([mod.pack for mod in __modules])
+    candidates = {
+        mod.pack: latest[mod.pack].version
+        for mod in __modules
+        if mod.pack in latest and (force or latest[mod.pack].version != mod.version)
+    }
+    msg = (
+        [await install_modules(list(candidates), True, candidates)]
+        if candidates
+        else []
+    )
     if msg:
+        hs.invalidate_versions()
         fwd_node_list = [
             ForwardNode(
                 target=config.account,
                 name=f"{config.name}#{config.num}",
                 time=datetime.now(),
-                message=MessageChain(f"已更新 {len(msg)} 个插件"),
+                message=MessageChain(f"已更新 {len(candidates)} 个插件"),
             )
         ] + [
             ForwardNode(
@@ -369,4 +430,13 @@ async def init():
     await db_init()
 
 
+@channel.use(SchedulerSchema(timer=timers.every_custom_seconds(2)))
+async def hot_reload():
+    if not config.loader.hot_reload:
+        return
+    if changed := reloader.changed():
+        reload_metadata()
+        await reloader.reload(changed)
+
+
 HelpMenu.register_box(HintBox("插件管理器使用方法", "插件打开 插件名", "插件关闭 插件名"))
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import NoReturn
+
+from loguru import logger
+
+from library import config
+from library.storage import atomic_write
+
+
+class ArchiveCache:
+    """
+    Content-addressed store of downloaded module archives, keyed by
+    SHA-256 and indexed by pack and version, evicted least recently used
+    first once the total size exceeds the configured capacity.
+    """
+
+    __instance: "ArchiveCache" = None
+    __directory: Path = Path(config.path.data, "library", "module_cache")
+    __index: dict[str, dict]
+    __lock: threading.Lock
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with self.__index_path.open("r", encoding="utf-8") as f:
+                self.__index = json.loads(f.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.__index = {}
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @property
+    def __index_path(self) -> Path:
+        return Path(self.__directory, "index.json")
+
+    def __archive(self, sha256: str) -> Path:
+        return Path(self.__directory, f"{sha256}.zip")
+
+    def __save(self) -> NoReturn:
+        atomic_write(self.__index_path, json.dumps(self.__index, indent=4))
+
+    @staticmethod
+    def __normalize(name: str) -> str:
+        return name.lower().replace("-", "_").split(".", maxsplit=1)[-1]
+
+    @staticmethod
+    def __hash(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def lookup(self, name: str, version: str = "") -> tuple[str, Path] | None:
+        """
+        Find a cached archive, the most recently stored version if no version is given.
+
+        :param name: Module name or pack.
+        :param version: Module version.
+        :return: Tuple of SHA-256 and path of the archive, or None if not cached.
+        """
+
+        name = self.__normalize(name)
+        with self.__lock:
+            candidates = sorted(
+                (
+                    (sha256, entry)
+                    for sha256, entry in self.__index.items()
+                    if self.__normalize(entry["pack"]) == name
+                    and (not version or entry["version"] == version)
+                ),
+                key=lambda x: x[1]["stored"],
+                reverse=True,
+            )
+        for sha256, entry in candidates:
+            archive = self.__archive(sha256)
+            if self.__intact(sha256, entry, archive):
+                self.touch(sha256)
+                return sha256, archive
+            logger.warning(f"Dropping corrupted cached archive of {entry['pack']}")
+            self.discard(sha256)
+        return None
+
+    def __intact(self, sha256: str, entry: dict, archive: Path) -> bool:
+        """
+        Check an archive against its hash, only re-hashed if its size or
+        mtime differs from the ones recorded when it was stored.
+
+        :param sha256: SHA-256 of the archive.
+        :param entry: Index entry of the archive.
+        :param archive: Path of the archive.
+        :return: bool.
+        """
+
+        try:
+            stat = archive.stat()
+        except FileNotFoundError:
+            return False
+        if (stat.st_size, stat.st_mtime_ns) == (
+            entry["size"],
+            entry.get("mtime", None),
+        ):
+            return True
+        if self.__hash(archive) != sha256:
+            return False
+        with self.__lock:
+            entry.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+        return True
+
+    def put(self, pack: str, version: str, sha256: str, archive: Path) -> Path:
+        """
+        Store an archive, a known hash only refreshes its entry.
+
+        :param pack: Module pack.
+        :param version: Module version.
+        :param sha256: SHA-256 of the archive.
+        :param archive: Path of the archive, it is copied.
+        :return: Path of the cached archive.
+        """
+
+        target = self.__archive(sha256)
+        if not target.is_file():
+            temp = target.with_suffix(".tmp")
+            shutil.copyfile(archive, temp)
+            os.replace(temp, target)
+        now = time.time()
+        stat = target.stat()
+        with self.__lock:
+            self.__index[sha256] = {
+                "pack": pack,
+                "version": version,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "stored": self.__index.get(sha256, {}).get("stored", now),
+                "used": now,
+            }
+            self.__evict()
+            self.__save()
+        return target
+
+    def touch(self, sha256: str) -> NoReturn:
+        """
+        Mark an archive as recently used.
+
+        :param sha256: SHA-256 of the archive.
+        :return: None.
+        """
+
+        with self.__lock:
+            if entry := self.__index.get(sha256, None):
+                entry["used"] = time.time()
+                self.__save()
+
+    def discard(self, sha256: str) -> NoReturn:
+        """
+        Remove an archive from the cache.
+
+        :param sha256: SHA-256 of the archive.
+        :return: None.
+        """
+
+        with self.__lock:
+            self.__index.pop(sha256, None)
+            self.__archive(sha256).unlink(missing_ok=True)
+            self.__save()
+
+    def __evict(self) -> NoReturn:
+        capacity = config.hub.cache_size
+        total = sum(entry["size"] for entry in self.__index.values())
+        for sha256, entry in sorted(self.__index.items(), key=lambda x: x[1]["used"]):
+            if total <= capacity:
+                break
+            total -= entry["size"]
+            del self.__index[sha256]
+            self.__archive(sha256).unlink(missing_ok=True)
+            logger.info(f"Evicted cached archive of {entry['pack']} {entry['version']}")
+
+
+archive_cache = ArchiveCache()
@@ -2,19 +2,25 @@ import asyncio
 import contextlib
 import os
 import shutil
+import tempfile
 import traceback
 from asyncio import Lock
 from pathlib import Path
-from typing import Union, List, NoReturn, Optional
+from typing import Callable, List, NoReturn, Optional, Tuple
 
+from aiohttp import ClientError
 from graia.ariadne.message.chain import MessageChain
 from graia.saya import Saya
 from loguru import logger
 
+from library import config
+from library.executor import executors
 from library.model import Module
 from library.orm import db_init
-from library.util.dependency import async_install_dependency
+from library.util.dependency import async_install_dependency, read_requirements_file
 from module import modules, ModuleMetadata
+from .cache import archive_cache
+from .resolve import resolve_closure
 from .uninstall import uninstall_module
 from ..util import hs
 
@@ -22,39 +28,108 @@ saya = Saya.current()
 
 install_lock = Lock()
 module_dir = Path(Path().resolve(), "module")
+cache_root = Path(Path(__file__).parent.parent, "__cache__")
 
 
-async def install_module(
-    name: str,
-    upgrade: bool,
-    version: str = "",
-    *,
-    is_dependency: bool = False,
-) -> Union[str, MessageChain]:
-    if pre_install := await pre_installation(name, upgrade):
-        return pre_install
-    if not (data_bytes := await hs.download_module(name=name, version=version)):
-        return "无法找到符合要求的插件" if is_dependency else MessageChain("无法找到符合要求的插件")
+async def install_module(name: str, upgrade: bool, version: str = "") -> MessageChain:
+    return await install_modules([name], upgrade, {name: version} if version else None)
+
+
+async def install_modules(
+    names: List[str], upgrade: bool, versions: dict[str, str] = None
+) -> MessageChain:
     msg = []
-    cache_dir = Path(Path(__file__).parent.parent, "__cache__")
-    if is_dependency:
-        cache_dir = Path(cache_dir, f"__dependency_{name}__")
+    targets = []
+    for name in names:
+        if not upgrade and (module := modules.get(name)):
+            msg.append(f"已安装插件 {name}，将不会作出改动\n已安装版本：{module.version}")
+        else:
+            targets.append(name)
+    if not targets:
+        return MessageChain("\n===============\n".join(msg))
+    cache_root.mkdir(parents=True, exist_ok=True)
+    batch_dir = Path(tempfile.mkdtemp(prefix="__batch_", dir=cache_root))
     try:
-        if not is_dependency:
-            await install_lock.acquire()
-        await async_prepare_cache(cache_dir, name, data_bytes)
-        module = await find_and_install(cache_dir)
-        await post_installation(module)
-        msg.append(f"成功安装插件 {name}\n已安装版本：{module.version}")
+        ordered, requires, missing = await resolve_closure(targets, versions)
+        msg.extend(f"无法找到符合要求的插件 {name}" for name in missing)
+        fetched = await download_all(ordered, batch_dir)
+        async with install_lock:
+            msg.extend(await install_batch(ordered, requires, fetched, batch_dir))
     except Exception as e:
-        msg.append(f"安装插件 {name} 时发生错误：\n{e}")
+        msg.append(f"安装插件 {', '.join(targets)} 时发生错误：\n{e}")
         logger.error(traceback.format_exc())
     finally:
-        shutil.rmtree(cache_dir)
-        if not is_dependency:
-            install_lock.release()
-        text = "\n===============\n".join(msg)
-        return text if is_dependency else MessageChain(text)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+    return MessageChain("\n===============\n".join(msg))
+
+
+async def download_all(
+    ordered: List[Module], batch_dir: Path
+) -> dict[str, Tuple[str, Path, bool] | BaseException | None]:
+    semaphore = asyncio.Semaphore(config.hub.concurrency)
+
+    async def __download(record: Module) -> Optional[Tuple[str, Path, bool]]:
+        async with semaphore:
+            return await fetch_archive(
+                record.pack,
+                record.version,
+                Path(batch_dir, f"{record.pack}.zip"),
+                prefer_cache=True,
+                expected=record.sha256,
+            )
+
+    results = await asyncio.gather(
+        *(__download(record) for record in ordered), return_exceptions=True
+    )
+    return {record.pack: result for record, result in zip(ordered, results)}
+
+
+async def install_batch(
+    ordered: List[Module],
+    requires: dict[str, set[str]],
+    fetched: dict[str, Tuple[str, Path, bool] | BaseException | None],
+    batch_dir: Path,
+) -> List[str]:
+    msg = []
+    failed = set()
+    staged: List[Tuple[Module, Path, Tuple[str, Path, bool]]] = []
+    for record in ordered:
+        result = fetched[record.pack]
+        if broken := requires[record.pack] & failed:
+            msg.append(f"无法安装插件 {record.pack}：依赖 {', '.join(broken)} 安装失败")
+        elif isinstance(result, BaseException) or result is None:
+            msg.append(f"无法下载插件 {record.pack}：{result or '无法找到符合要求的插件'}")
+            if isinstance(result, BaseException):
+                logger.opt(exception=result).error(f"Failed to download {record.pack}")
+        else:
+            target = Path(batch_dir, record.pack)
+            await async_prepare_cache(target, result[1])
+            if found := find_module(target):
+                staged.append((*found, result))
+                continue
+            msg.append(f"无法安装插件 {record.pack}：压缩包内未找到插件")
+        failed.add(record.pack)
+    if requirements := [
+        requirement
+        for module, path, _ in staged
+        if module.pypi
+        for requirement in read_requirements_file(Path(path, "requirements.txt"))
+    ]:
+        await async_install_dependency(requirements=requirements)
+    for module, path, (sha256, archive, cached) in staged:
+        await pre_installation(module.pack, True)
+        await async_move_module(path)
+        if not cached:
+            await executors.run(
+                "module",
+                archive_cache.put,
+                module.pack,
+                module.version,
+                sha256,
+                archive,
+            )
+    msg.extend(await post_installation([module for module, _, _ in staged]))
+    return msg
 
 
 async def pre_installation(name: str, upgrade: bool) -> Optional[MessageChain]:
@@ -68,23 +143,67 @@ async def pre_installation(name: str, upgrade: bool) -> Optional[MessageChain]:
         return
 
 
-def prepare_cache(cache_dir: Path, name: str, data: bytes) -> NoReturn:
-    cache_dir.mkdir(exist_ok=True)
-    with Path(cache_dir, f"{name}.zip").open("wb") as f:
-        f.write(data)
-    shutil.unpack_archive(
-        Path(cache_dir, f"{name}.zip"),
-        cache_dir,
-    )
-    Path(cache_dir, f"{name}.zip").unlink(missing_ok=True)
+def progress_logger(name: str, step: float = 0.1) -> Callable[[int, int | None], None]:
+    logged = 0
+
+    def __progress(done: int, total: int | None):
+        nonlocal logged
+        interval = total * step if total else 1024 * 1024
+        if done - logged < interval and done != total:
+            return
+        logged = done
+        if total:
+            logger.info(
+                f"Downloading {name}: {done / total:.0%} ({done}/{total} bytes)"
+            )
+        else:
+            logger.info(f"Downloading {name}: {done} bytes")
 
+    return __progress
 
-async def async_prepare_cache(cache_dir: Path, name: str, data: bytes) -> NoReturn:
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, prepare_cache, cache_dir, name, data)
 
+async def fetch_archive(
+    name: str,
+    version: str,
+    archive: Path,
+    prefer_cache: bool,
+    expected: str = None,
+) -> Optional[Tuple[str, Path, bool]]:
+    async def __cached() -> Optional[Tuple[str, Path]]:
+        if cached := await executors.run("module", archive_cache.lookup, name, version):
+            if not expected or cached[0] == expected.lower():
+                return cached
+        return None
+
+    if (version or prefer_cache) and (cached := await __cached()):
+        logger.info(f"Using cached archive of {name}")
+        return *cached, True
+    try:
+        if sha256 := await hs.stream_module(
+            name=name,
+            target=archive,
+            version=version,
+            expected=expected,
+            progress=progress_logger(name),
+        ):
+            return sha256, archive, False
+        return None
+    except (ClientError, asyncio.TimeoutError) as e:
+        if not (cached := await __cached()):
+            raise
+        logger.warning(f"Failed to download {name}, using cached archive: {e}")
+        return *cached, True
+
+
+def prepare_cache(cache_dir: Path, archive: Path) -> NoReturn:
+    shutil.unpack_archive(archive, cache_dir)
 
-async def find_and_install(cache_dir: Path) -> Module:
+
+async def async_prepare_cache(cache_dir: Path, archive: Path) -> NoReturn:
+    await executors.run("module", prepare_cache, cache_dir, archive)
+
+
+def find_module(cache_dir: Path) -> Optional[Tuple[Module, Path]]:
     for path in cache_dir.iterdir():
         if path.is_dir():
             if (
@@ -93,29 +212,7 @@ async def find_and_install(cache_dir: Path) -> Module:
                 or path.name.startswith(".")
             ):
                 continue
-            module = ModuleMetadata.read_and_update(path, path.is_dir())
-            await resolve_dependency(module, path)
-            await async_move_module(path)
-            return module
-
-
-async def resolve_dependency(module: Module, path: Path) -> List[str]:
-    msg = []
-    if module.pypi and Path(path, "requirements.txt").is_file():
-        await async_install_dependency(
-            requirements=Path(path, "requirements.txt").read_text().splitlines()
-        )
-    if module.dependency:
-        for dependency in module.dependency:
-            logger.info(f"Installing dependency: {dependency}")
-            msg.append(
-                await install_module(
-                    dependency,
-                    upgrade=True,
-                    is_dependency=True,
-                )
-            )
-    return msg
+            return ModuleMetadata.read_and_update(path, path.is_dir()), path
 
 
 def move_module(path: Path) -> NoReturn:
@@ -131,13 +228,21 @@ def move_module(path: Path) -> NoReturn:
 
 
 async def async_move_module(path: Path) -> NoReturn:
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, move_module, path)
+    await executors.run("module", move_module, path)
 
 
-async def post_installation(module: Module) -> NoReturn:
+async def post_installation(installed: List[Module]) -> List[str]:
+    msg = []
     with saya.module_context():
-        saya.require(module.pack)
-        await db_init()
-    module.loaded = True
-    modules.add(module)
+        for module in installed:
+            try:
+                saya.require(module.pack)
+            except Exception as e:
+                msg.append(f"安装插件 {module.pack} 时发生错误：\n{e}")
+                logger.error(traceback.format_exc())
+                continue
+            module.loaded = True
+            modules.add(module)
+            msg.append(f"成功安装插件 {module.pack}\n已安装版本：{module.version}")
+    await db_init()
+    return msg
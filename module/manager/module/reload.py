@@ -0,0 +1,158 @@
+import sys
+from pathlib import Path
+from typing import NoReturn
+
+from graia.saya import Saya
+from loguru import logger
+from sqlalchemy.orm import clsregistry
+
+from library.model import Module
+from library.orm import Base, db_init
+from library.util.lazy import lazy
+from module import modules
+
+saya = Saya.current()
+
+
+class PluginReloader:
+    """
+    Tracks the newest mtime of every plugin's source files and reloads
+    changed plugins together with the plugins depending on them, the
+    first check only takes the snapshot.
+    """
+
+    __instance: "PluginReloader" = None
+    __signatures: dict[str, tuple[int, int] | None] | None
+
+    def __init__(self):
+        self.__signatures = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls.__instance is None:
+            cls.__instance = super().__new__(cls)
+        return cls.__instance
+
+    @staticmethod
+    def __signature(module: Module) -> tuple[int, int] | None:
+        """
+        Get the newest mtime and the number of source files of a plugin.
+
+        :param module: Module object.
+        :return: Tuple of mtime in nanoseconds and file count, or None if not found.
+        """
+
+        path = Path(Path().resolve(), *module.pack.split("."))
+        if path.is_dir():
+            files = [
+                file for file in path.rglob("*.py") if "__pycache__" not in file.parts
+            ]
+        elif (file := path.with_suffix(".py")).is_file():
+            files = [file]
+        else:
+            return None
+        mtime = 0
+        for file in files:
+            try:
+                mtime = max(mtime, file.stat().st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return mtime, len(files)
+
+    def snapshot(self) -> NoReturn:
+        """
+        Record the current state of every plugin.
+
+        :return: None.
+        """
+
+        self.__signatures = {
+            module.pack: self.__signature(module) for module in modules
+        }
+
+    def changed(self) -> list[Module]:
+        """
+        Get loaded plugins whose source files changed since the last check.
+
+        :return: List of modules.
+        """
+
+        if self.__signatures is None:
+            self.snapshot()
+            return []
+        changed = []
+        for module in modules:
+            signature = self.__signature(module)
+            if self.__signatures.get(module.pack, signature) != signature:
+                changed.append(module)
+            self.__signatures[module.pack] = signature
+        return [module for module in changed if module.pack in saya.channels]
+
+    @staticmethod
+    def __purge(pack: str) -> NoReturn:
+        """
+        Forget the imported modules, mapped classes and declared tables of
+        a plugin, so requiring it again executes the new source.
+
+        :param pack: Module pack.
+        :return: None.
+        """
+
+        def __owned(name: str) -> bool:
+            return name == pack or name.startswith(f"{pack}.")
+
+        for mapper in list(Base.registry.mappers):
+            if __owned((cls := mapper.class_).__module__):
+                for table in mapper.tables:
+                    if table.key in Base.metadata.tables:
+                        Base.metadata.remove(table)
+                clsregistry.remove_class(
+                    cls.__name__, cls, Base.registry._class_registry
+                )
+                mapper.dispose()
+        for name in [name for name in sys.modules if __owned(name)]:
+            del sys.modules[name]
+
+    async def reload(self, targets: list[Module]) -> list[Module]:
+        """
+        Reload plugins and every plugin depending on them, database tables
+        are only created if the reload declared new ones.
+
+        :param targets: Modules to reload.
+        :return: Reloaded modules in load order.
+        """
+
+        closure: set[str] = set()
+        queue = list(targets)
+        while queue:
+            if (module := queue.pop()).pack in closure:
+                continue
+            closure.add(module.pack)
+            queue.extend(modules.dependants(module))
+        ordered = [
+            module
+            for module in modules
+            if module.pack in closure and not lazy.pending(module.pack)
+        ]
+        tables = set(Base.metadata.tables)
+        for module in reversed(ordered):
+            if chn := saya.channels.get(module.pack, None):
+                saya.uninstall_channel(chn)
+            self.__purge(module.pack)
+        with saya.module_context():
+            for module in ordered:
+                if not module.loaded:
+                    continue
+                try:
+                    saya.require(module.pack)
+                except Exception as e:
+                    logger.error(f"Failed to reload {module.pack}: {e}")
+        if set(Base.metadata.tables) - tables:
+            await db_init()
+        if self.__signatures is not None:
+            for module in ordered:
+                self.__signatures[module.pack] = self.__signature(module)
+        logger.success(f"Reloaded {', '.join(module.pack for module in ordered)}")
+        return ordered
+
+
+reloader = PluginReloader()
@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from library import config
+from library.model import Module
+from module import modules
+from ..util import hs
+
+
+def normalize(name: str) -> str:
+    return name.lower().replace("-", "_")
+
+
+def aliases(record: Module) -> set[str]:
+    pack = normalize(record.pack)
+    return {pack, pack.split(".")[-1], normalize(record.name)}
+
+
+async def find_record(
+    name: str, version: str, semaphore: asyncio.Semaphore
+) -> Optional[Module]:
+    async with semaphore:
+        if not (records := await hs.search_module(name=name, version=version)):
+            return None
+    key = normalize(name)
+    return next((record for record in records if key in aliases(record)), None)
+
+
+async def resolve_closure(
+    names: List[str], versions: dict[str, str] = None
+) -> Tuple[List[Module], dict[str, set[str]], List[str]]:
+    versions = versions or {}
+    semaphore = asyncio.Semaphore(config.hub.concurrency)
+    requested = {normalize(name) for name in names}
+    records: dict[str, Module] = {}
+    lookup: dict[str, str] = {}
+    missing = []
+    seen = set()
+    frontier = list(names)
+    while frontier:
+        frontier = list(
+            {
+                normalize(name): name
+                for name in frontier
+                if normalize(name) not in seen
+            }.values()
+        )
+        seen.update(normalize(name) for name in frontier)
+        found = await asyncio.gather(
+            *(find_record(name, versions.get(name, ""), semaphore) for name in frontier)
+        )
+        next_frontier = []
+        for name, record in zip(frontier, found):
+            if record is None:
+                missing.append(name)
+                continue
+            lookup[normalize(name)] = record.pack
+            if record.pack in records:
+                continue
+            if (
+                normalize(name) not in requested
+                and (installed := modules.get(record.pack))
+                and installed.version == record.version
+            ):
+                continue
+            records[record.pack] = record
+            next_frontier.extend(record.dependency or [])
+        frontier = next_frontier
+    requires = {
+        pack: {
+            lookup[normalize(dependency)]
+            for dependency in record.dependency or []
+            if lookup.get(normalize(dependency), None) in records
+        }
+        - {pack}
+        for pack, record in records.items()
+    }
+    return install_order(records, requires), requires, missing
+
+
+def install_order(
+    records: dict[str, Module], requires: dict[str, set[str]]
+) -> List[Module]:
+    requires = {pack: set(deps) for pack, deps in requires.items()}
+    ordered = []
+    while requires:
+        if not (ready := [pack for pack, deps in requires.items() if not deps]):
+            logger.warning(f"Circular dependency detected among {', '.join(requires)}")
+            ready = list(requires)
+        for pack in ready:
+            requires.pop(pack)
+            ordered.append(records[pack])
+        for deps in requires.values():
+            deps.difference_update(ready)
+    return ordered
@@ -3,14 +3,20 @@ from typing import Union
 from graia.ariadne.message.chain import MessageChain
 from graia.ariadne.model import Group
 
+from library.model import Module
 from library.util.switch import switch
 from module import modules as modules
 
 
-def module_switch(name: str, group: Union[int, Group], value: bool) -> bool:
+def switchable(name: str, value: bool) -> Module | None:
     if module := modules.get(name):
         if isinstance(module.override_switch, bool) and module.override_switch != value:
-            return False
+            return None
+        return module
+
+
+def module_switch(name: str, group: Union[int, Group], value: bool) -> bool:
+    if module := switchable(name, value):
         switch.update(pack=module.pack, group=group, value=value)
         return True
 
@@ -27,13 +33,15 @@ def module_switch_msg(*args, **kwargs) -> MessageChain:
     group = kwargs.get("group", 0)
     if not isinstance(value := kwargs.get("value", None), bool):
         raise AssertionError("未指定参数 value")
-    success_count = 0
+    updates = []
     failed = []
     for name in args:
-        if module_switch(name, group, value):
-            success_count += 1
+        if module := switchable(name, value):
+            updates.append((module.pack, group, value))
         else:
             failed.append(name)
+    switch.update_many(updates)
+    success_count = len(updates)
     msg = MessageChain(f"已{'开启' if value else '关闭'} {success_count} 个插件")
     if failed:
         msg += MessageChain(f"\n以下 {len(failed)} 个插件无法找到或无法改动：")
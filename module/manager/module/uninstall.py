@@ -1,9 +1,9 @@
-import asyncio
 import shutil
 from pathlib import Path
 
 from loguru import logger
 
+from library.executor import executors
 from library.model import Module
 
 
@@ -23,5 +23,4 @@ def uninstall_module(module: Module = None, path: Path = None):
 
 
 async def async_uninstall_module(module: Module = None, path: Path = None):
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, uninstall_module, module, path)
+    await executors.run("module", uninstall_module, module, path)